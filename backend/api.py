@@ -3,8 +3,15 @@ import json
 import time
 import os
 
-def send_api():
-    base_url = "http://127.0.0.1:5000"
+def send_api(base_url: str | None = None, device_id: str | None = None):
+    """Power on a device and print its status.
+
+    Targets DEVICE_API_URL (default the virtual washer on :5000); with `device_id`, the
+    per-device routes of the fleet simulator (/devices/<id>/power, /devices/<id>/status).
+    """
+    base_url = base_url or os.getenv("DEVICE_API_URL", "http://127.0.0.1:5000")
+    if device_id:
+        base_url = f"{base_url}/devices/{device_id}"
 
     power_response = requests.get(f"{base_url}/power", params={"state": "on"})
 
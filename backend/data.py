@@ -1,66 +1,105 @@
+import os
+import numpy as np
 import pandas as pd
 import warnings
 warnings.filterwarnings("ignore", category=UserWarning, module="openpyxl")
 
-def data():
-    def calculate_percentage(supply, energy_source):
-        try:
-            energy_source = float(energy_source)
-            supply = float(supply)
-            if supply == 0:
-                return 0
-            return energy_source / supply
-        except ValueError:
-            return 0
-
-    def clean_energy(df):
-        # `row` is a pandas Series for a single record
-        row = df
-        scor = 0.0
-
-        # safe numeric conversion helper
-        def to_num(x):
-            try:
-                return float(x)
-            except Exception:
-                return 0.0
-
-        prod = to_num(row.get('Productie[MW]', 0))
-        scor += 0.35 * calculate_percentage(prod, row.get('Hidrocarburi[MW]', 0))
-        scor -= 0.2 * calculate_percentage(prod, row.get('Carbune[MW]', 0))
-        scor += calculate_percentage(prod, row.get('Ape[MW]', 0))
-        scor += calculate_percentage(prod, row.get('Nuclear[MW]', 0))
-        scor += calculate_percentage(prod, row.get('Eolian[MW]', 0))
-        scor += calculate_percentage(prod, row.get('Foto[MW]', 0))
-        scor += calculate_percentage(prod, row.get('Biomasa[MW]', 0))
-
-        sold = to_num(row.get('Sold[MW]', 0))
-        if sold > 0:
-            scor -= 1.2 * calculate_percentage(prod, sold)
-        else:
-            scor += 2.5 * calculate_percentage(prod, sold)
-
-        scor *= 100
-        # ensure numeric
-        try:
-            return float(scor)
-        except Exception:
-            return 0.0
-
-
-
-    df = pd.read_excel("input/Grafic_SEN (1).xlsx")
+# generation-mix weights of the clean-energy score (share of production per source)
+SOURCE_WEIGHTS = {
+    'Hidrocarburi[MW]': 0.35,
+    'Carbune[MW]': -0.2,
+    'Ape[MW]': 1.0,
+    'Nuclear[MW]': 1.0,
+    'Eolian[MW]': 1.0,
+    'Foto[MW]': 1.0,
+    'Biomasa[MW]': 1.0,
+}
+# export (Sold > 0) is penalized, import (Sold <= 0) weighted as below
+EXPORT_WEIGHT = -1.2
+IMPORT_WEIGHT = 2.5
+
+
+def clean_energy(df: pd.DataFrame) -> pd.Series:
+    """Vectorized clean-energy score for every row of a SEN DataFrame.
+
+    Score = 100 * sum(weight * source / Productie) over the generation sources plus the
+    import/export balance term. Missing columns and non-numeric cells count as 0 and a zero
+    production gives a zero share, the same rules the original row-by-row version applied.
+    """
+    def column(name):
+        if name not in df.columns:
+            return pd.Series(0.0, index=df.index)
+        raw = df[name]
+        num = pd.to_numeric(raw, errors='coerce')
+        # cells that are present but not numeric count as 0; genuinely empty cells stay NaN
+        return num.mask(num.isna() & raw.notna(), 0.0).astype('float64')
+
+    prod = column('Productie[MW]')
+    safe_prod = prod.mask(prod == 0)
+
+    def share(source):
+        return (source / safe_prod).mask(prod == 0, 0.0)
+
+    scor = pd.Series(0.0, index=df.index)
+    for name, weight in SOURCE_WEIGHTS.items():
+        scor += weight * share(column(name))
+
+    sold = column('Sold[MW]')
+    sold_weight = np.where(sold > 0, EXPORT_WEIGHT, IMPORT_WEIGHT)
+    scor += sold_weight * share(sold)
+
+    return scor * 100
+
+
+def to_regular_grid(
+    df: pd.DataFrame,
+    step: str = '10min',
+    time_col: str = 'Data',
+    max_gap: int = 6,
+) -> pd.DataFrame:
+    """Resample raw SEN rows onto a regular `step` grid and fill short gaps.
+
+    - Measurements are averaged into [t, t + step) buckets aligned to midnight.
+    - Empty buckets inside the series are time-interpolated, up to `max_gap` consecutive steps.
+    - Adds a 'Calitate' column: 'ok' (measured), 'interpolat' (filled) or 'lipsa' (still missing).
+    The result has exactly one row per step from the first to the last bucket, so the row of a
+    timestamp t is (t - t0) // step.
+    """
+    out = df.dropna(subset=[time_col]).copy()
+    value_cols = [c for c in out.columns if c != time_col]
+    for c in value_cols:
+        out[c] = pd.to_numeric(out[c], errors='coerce')
+
+    grid = out.set_index(time_col).sort_index().resample(step).mean()
+    measured = grid.notna().any(axis=1)
+    grid = grid.interpolate(method='time', limit=max_gap, limit_area='inside')
+    filled = grid.notna().any(axis=1)
+
+    grid['Calitate'] = np.where(measured, 'ok', np.where(filled, 'interpolat', 'lipsa'))
+    grid.index.name = time_col
+    grid = grid.reset_index()
+    return grid
+
+
+def data(path: str = "input/Grafic_SEN (1).xlsx", step: str | None = None):
+    step = step or os.getenv("SEN_GRID_STEP", "10min")
+    df = pd.read_csv(path) if path.lower().endswith('.csv') else pd.read_excel(path)
     # parse datetime first to allow dropping invalid rows early
     df['Data'] = pd.to_datetime(df['Data'], errors='coerce', dayfirst=True)
+    # drop rows with invalid/missing Data (which often indicate empty trailing rows in the Excel file)
+    df = df.dropna(subset=['Data'])
+    # one row per grid step, short gaps interpolated and flagged in 'Calitate'
+    df = to_regular_grid(df, step=step)
+    quality = df['Calitate'].value_counts()
+    if quality.get('ok', 0) < len(df):
+        print(f"Data quality on {step} grid: " + ", ".join(f"{k}={v}" for k, v in quality.items()))
+
     # compute score per row
-    df['Scor'] = df.apply(clean_energy, axis=1)
+    df['Scor'] = clean_energy(df)
     df['Ora'] = df['Data'].dt.hour
     df['Minut'] = df['Data'].dt.minute
     df['Ziua'] = df['Data'].dt.day
     df['Luna'] = df['Data'].dt.month
     df['Weekday'] = df['Data'].dt.weekday
 
-    # drop rows with invalid/missing Data (which often indicate empty trailing rows in the Excel file)
-    df = df.dropna(subset=['Data'])
-
-    return df
\ No newline at end of file
+    return df
@@ -0,0 +1,186 @@
+import atexit
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+
+# Append-only log of decisions and actuations. Request threads only enqueue events; one
+# background thread writes them to SQLite (WAL mode) in batches, so logging never waits on disk.
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY,
+    ts REAL NOT NULL,
+    device TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    action TEXT,
+    color TEXT,
+    score REAL,
+    triggered INTEGER,
+    duration_ms REAL,
+    data TEXT
+);
+CREATE INDEX IF NOT EXISTS events_device_ts ON events (device, ts);
+CREATE INDEX IF NOT EXISTS events_ts ON events (ts);
+"""
+_COLUMNS = ("ts", "device", "kind", "action", "color", "score", "triggered", "duration_ms", "data")
+
+
+def default_path() -> str:
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    return os.getenv("EVENT_LOG_DB") or os.path.join(base_dir, "data", "events.sqlite3")
+
+
+class EventLog:
+    """Batched, append-only SQLite event store.
+
+    - log(): non-blocking, safe from any thread.
+    - A daemon writer inserts up to `batch_size` queued events per transaction, at least every
+      `flush_interval` seconds.
+    - query(): indexed reads by device and time range on a separate connection (WAL lets
+      readers run while the writer appends).
+    """
+
+    def __init__(self, path: str | None = None, batch_size: int = 256, flush_interval: float = 0.5):
+        self.path = path or default_path()
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._closed = False
+        conn = self._connect()
+        conn.executescript(_SCHEMA)
+        conn.close()
+        self._writer = threading.Thread(target=self._run, name="event-log-writer", daemon=True)
+        self._writer.start()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=10)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def log(self, kind: str, device: str = "washer", **fields):
+        """Queue one event. Known fields: action, color, score, triggered, duration_ms; the rest go to `data`."""
+        if self._closed:
+            return
+        row = {
+            "ts": fields.pop("ts", None) or time.time(),
+            "device": device,
+            "kind": kind,
+            "action": fields.pop("action", None),
+            "color": fields.pop("color", None),
+            "score": fields.pop("score", None),
+            "triggered": fields.pop("triggered", None),
+            "duration_ms": fields.pop("duration_ms", None),
+        }
+        if row["triggered"] is not None:
+            row["triggered"] = int(bool(row["triggered"]))
+        fields = {k: v for k, v in fields.items() if v is not None}
+        row["data"] = json.dumps(fields, default=str) if fields else None
+        self._queue.put(tuple(row[c] for c in _COLUMNS))
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """Block until everything queued so far is written (for tests, shutdown and reports)."""
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout)
+
+    def close(self):
+        if not self._closed:
+            self.flush()
+            self._closed = True
+            self._queue.put(None)
+            self._writer.join(timeout=5)
+
+    def _run(self):
+        conn = self._connect()
+        insert = f"INSERT INTO events ({', '.join(_COLUMNS)}) VALUES ({', '.join('?' * len(_COLUMNS))})"
+        stop = False
+        while not stop:
+            batch, waiters = [], []
+            try:
+                item = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+            deadline = time.monotonic() + self.flush_interval
+            while True:
+                if item is None:
+                    stop = True
+                elif isinstance(item, threading.Event):
+                    waiters.append(item)
+                else:
+                    batch.append(item)
+                if stop or waiters or len(batch) >= self.batch_size:
+                    break
+                try:
+                    item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+            if batch:
+                try:
+                    with conn:
+                        conn.executemany(insert, batch)
+                except sqlite3.Error as e:
+                    print(f"Warning: could not write {len(batch)} events to {self.path}: {e}")
+            for w in waiters:
+                w.set()
+        conn.close()
+
+    def query(
+        self,
+        device: str | None = None,
+        start: float | None = None,
+        end: float | None = None,
+        kind: str | None = None,
+        limit: int = 1000,
+    ) -> list[dict]:
+        """Events with start <= ts < end (unix seconds), newest first."""
+        where, params = [], []
+        if device is not None:
+            where.append("device = ?")
+            params.append(device)
+        if start is not None:
+            where.append("ts >= ?")
+            params.append(start)
+        if end is not None:
+            where.append("ts < ?")
+            params.append(end)
+        if kind is not None:
+            where.append("kind = ?")
+            params.append(kind)
+        sql = f"SELECT id, {', '.join(_COLUMNS)} FROM events"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY ts DESC LIMIT ?"
+        params.append(int(limit))
+
+        conn = sqlite3.connect(self.path, timeout=10)
+        try:
+            rows = conn.execute(sql, params).fetchall()
+        finally:
+            conn.close()
+        out = []
+        for row in rows:
+            event = dict(zip(("id",) + _COLUMNS, row))
+            if event["triggered"] is not None:
+                event["triggered"] = bool(event["triggered"])
+            event["data"] = json.loads(event["data"]) if event["data"] else None
+            out.append(event)
+        return out
+
+
+_log: EventLog | None = None
+_log_lock = threading.Lock()
+
+
+def get_event_log() -> EventLog:
+    """Process-wide event log, created on first use and flushed at exit."""
+    global _log
+    with _log_lock:
+        if _log is None:
+            _log = EventLog()
+            atexit.register(_log.close)
+        return _log
@@ -0,0 +1,299 @@
+import argparse
+import asyncio
+import json
+import os
+import random
+import time
+from urllib.parse import parse_qs, urlsplit
+
+# Simulates a fleet of virtual appliances behind one asyncio HTTP server and load-tests
+# command dispatch against it. Each device answers the same /power and /status calls as
+# virtual_washer.py, under /devices/<id>/...
+#
+#   python fleet_sim.py serve --devices 5000 --latency-ms 20 --jitter-ms 10 --failure-rate 0.01
+#   python fleet_sim.py load --devices 5000 --concurrency 200 --mode send_api
+
+
+def device_id(i: int) -> str:
+    return f"dev-{i:05d}"
+
+
+class Fleet:
+    """In-memory state of all virtual devices plus the simulated network behaviour."""
+
+    def __init__(
+        self,
+        n_devices: int,
+        latency_ms: float = 20.0,
+        jitter_ms: float = 10.0,
+        failure_rate: float = 0.0,
+        power_w: float = 2000.0,
+        seed: int | None = None,
+    ):
+        self.rng = random.Random(seed)
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.failure_rate = failure_rate
+        self.devices = {
+            device_id(i): {"power": "off", "rated_w": round(power_w * self.rng.uniform(0.8, 1.2), 1), "since": None}
+            for i in range(n_devices)
+        }
+        self.requests = 0
+        self.failures = 0
+        self.commands = 0
+
+    def draw_w(self, dev: dict) -> float:
+        return dev["rated_w"] if dev["power"] == "on" else 0.0
+
+    async def handle(self, path: str, query: dict) -> tuple[int, dict]:
+        """Route one request; returns (status, JSON body)."""
+        self.requests += 1
+        delay = max(0.0, self.rng.gauss(self.latency_ms, self.jitter_ms)) / 1000
+        if delay:
+            await asyncio.sleep(delay)
+        if self.rng.random() < self.failure_rate:
+            self.failures += 1
+            return 503, {"error": "simulated device failure"}
+
+        parts = [p for p in path.split("/") if p]
+        if parts == ["fleet", "stats"]:
+            on = sum(1 for d in self.devices.values() if d["power"] == "on")
+            return 200, {
+                "devices": len(self.devices),
+                "on": on,
+                "draw_w": round(sum(self.draw_w(d) for d in self.devices.values()), 1),
+                "requests": self.requests,
+                "commands": self.commands,
+                "failures": self.failures,
+            }
+        # /power and /status without an id address the first device (same API as virtual_washer.py)
+        if len(parts) == 1:
+            parts = ["devices", device_id(0), parts[0]]
+        if len(parts) != 3 or parts[0] != "devices":
+            return 404, {"error": "not found"}
+        dev = self.devices.get(parts[1])
+        if dev is None:
+            return 404, {"error": f"unknown device {parts[1]}"}
+
+        if parts[2] == "power":
+            state = (query.get("state") or [None])[0]
+            if state not in ("on", "off"):
+                return 400, {"error": "Invalid state. Use ?state=on or ?state=off"}
+            self.commands += 1
+            if dev["power"] != state:
+                dev["power"] = state
+                dev["since"] = time.time()
+            return 200, {"id": parts[1], "power": dev["power"]}
+        if parts[2] == "status":
+            return 200, {"id": parts[1], "power": dev["power"], "draw_w": self.draw_w(dev)}
+        return 404, {"error": "not found"}
+
+
+_REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 503: "Service Unavailable"}
+
+
+async def _serve_connection(fleet: Fleet, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+    """Minimal HTTP/1.1 GET handler with keep-alive, enough for send_api-style clients."""
+    try:
+        while True:
+            request_line = await reader.readline()
+            if not request_line:
+                break
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b"\n", b""):
+                    break
+                name, _, value = line.decode("latin-1").partition(":")
+                headers[name.strip().lower()] = value.strip()
+            length = int(headers.get("content-length", "0") or 0)
+            if length:
+                await reader.readexactly(length)
+
+            try:
+                _, target, version = request_line.decode("latin-1").split()
+            except ValueError:
+                break
+            url = urlsplit(target)
+            status, body = await fleet.handle(url.path, parse_qs(url.query))
+            payload = json.dumps(body).encode()
+            keep_alive = version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+            writer.write(
+                f"HTTP/1.1 {status} {_REASONS.get(status, 'OK')}\r\n"
+                f"Content-Type: application/json\r\nContent-Length: {len(payload)}\r\n"
+                f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode() + payload
+            )
+            await writer.drain()
+            if not keep_alive:
+                break
+    except (ConnectionError, asyncio.IncompleteReadError):
+        pass
+    finally:
+        writer.close()
+
+
+async def serve(fleet: Fleet, host: str = "127.0.0.1", port: int = 5100):
+    server = await asyncio.start_server(lambda r, w: _serve_connection(fleet, r, w), host, port, backlog=4096)
+    print(f"Fleet of {len(fleet.devices)} virtual devices on http://{host}:{port}/devices/<id>/(power|status)")
+    async with server:
+        await server.serve_forever()
+
+
+class _Connection:
+    """One persistent HTTP/1.1 connection used by the load generator."""
+
+    def __init__(self, host: str, port: int):
+        self.host, self.port = host, port
+        self.reader = self.writer = None
+
+    async def get(self, target: str) -> int:
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        self.writer.write(f"GET {target} HTTP/1.1\r\nHost: {self.host}\r\n\r\n".encode())
+        await self.writer.drain()
+        status = int((await self.reader.readline()).split()[1])
+        length = 0
+        while True:
+            line = await self.reader.readline()
+            if line in (b"\r\n", b""):
+                break
+            if line.lower().startswith(b"content-length:"):
+                length = int(line.split(b":")[1])
+        await self.reader.readexactly(length)
+        return status
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+
+def _percentile(sorted_values: list, q: float) -> float:
+    if not sorted_values:
+        return float("nan")
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+async def dispatch(
+    base_url: str,
+    device_ids: list,
+    concurrency: int = 200,
+    mode: str = "power",
+) -> dict:
+    """Send one command to every device over `concurrency` keep-alive connections.
+
+    mode='power' sends /power?state=on; mode='send_api' mirrors api.send_api (power, then status).
+    Returns throughput and latency percentiles (ms) per command.
+    """
+    url = urlsplit(base_url)
+    queue: asyncio.Queue = asyncio.Queue()
+    for dev in device_ids:
+        queue.put_nowait(dev)
+    latencies, failures = [], 0
+
+    async def worker():
+        nonlocal failures
+        conn = _Connection(url.hostname or "127.0.0.1", url.port or 80)
+        try:
+            while not queue.empty():
+                dev = queue.get_nowait()
+                t0 = time.perf_counter()
+                try:
+                    ok = await conn.get(f"/devices/{dev}/power?state=on") == 200
+                    if ok and mode == "send_api":
+                        ok = await conn.get(f"/devices/{dev}/status") == 200
+                except (ConnectionError, asyncio.IncompleteReadError, ValueError, IndexError):
+                    ok = False
+                    conn.close()
+                    conn = _Connection(url.hostname or "127.0.0.1", url.port or 80)
+                latencies.append((time.perf_counter() - t0) * 1000)
+                if not ok:
+                    failures += 1
+        finally:
+            conn.close()
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(min(concurrency, len(device_ids)) or 1)))
+    elapsed = time.perf_counter() - t0
+    latencies.sort()
+    return {
+        "commands": len(latencies),
+        "failures": failures,
+        "seconds": round(elapsed, 3),
+        "commands_per_s": round(len(latencies) / elapsed, 1) if elapsed else None,
+        "p50_ms": round(_percentile(latencies, 0.50), 2),
+        "p95_ms": round(_percentile(latencies, 0.95), 2),
+        "p99_ms": round(_percentile(latencies, 0.99), 2),
+        "max_ms": round(latencies[-1], 2) if latencies else None,
+    }
+
+
+def fleet_decision(when=None, objective: str = "co2") -> tuple[bool, dict | None]:
+    """Forecast side of a fleet dispatch, with the same start rule /decision applies to one washer."""
+    from use import evaluate
+
+    inside, details, _, start = evaluate(when=when, objective=objective)
+    return inside and start, details
+
+
+async def load_test(args) -> dict:
+    """Optionally host the fleet in-process, run the decision once, then dispatch to every device."""
+    server = None
+    if args.base_url is None:
+        fleet = Fleet(args.devices, args.latency_ms, args.jitter_ms, args.failure_rate, args.power_w, seed=args.seed)
+        server = await asyncio.start_server(lambda r, w: _serve_connection(fleet, r, w), "127.0.0.1", 0, backlog=4096)
+        base_url = f"http://127.0.0.1:{server.sockets[0].getsockname()[1]}"
+    else:
+        base_url = args.base_url
+
+    result = {"mode": args.mode, "devices": args.devices, "concurrency": args.concurrency}
+    try:
+        if args.decide:
+            t0 = time.perf_counter()
+            go, details = fleet_decision(objective=args.objective)
+            result["decision_ms"] = round((time.perf_counter() - t0) * 1000, 2)
+            result["decision"] = {"dispatch": go, "color": (details or {}).get("Color")}
+            if not go:
+                return result
+        ids = [device_id(i) for i in range(args.devices)]
+        result.update(await dispatch(base_url, ids, args.concurrency, args.mode))
+    finally:
+        if server is not None:
+            server.close()
+            await server.wait_closed()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Virtual appliance fleet simulator and dispatch load test")
+    sub = parser.add_subparsers(dest="command", required=True)
+    for name in ("serve", "load"):
+        p = sub.add_parser(name)
+        p.add_argument("--devices", type=int, default=int(os.getenv("FLEET_DEVICES", "1000")))
+        p.add_argument("--latency-ms", type=float, default=20.0)
+        p.add_argument("--jitter-ms", type=float, default=10.0)
+        p.add_argument("--failure-rate", type=float, default=0.0)
+        p.add_argument("--power-w", type=float, default=2000.0, help="mean rated draw per device")
+        p.add_argument("--seed", type=int, default=None)
+    serve_p = sub.choices["serve"]
+    serve_p.add_argument("--host", default="127.0.0.1")
+    serve_p.add_argument("--port", type=int, default=5100)
+    load_p = sub.choices["load"]
+    load_p.add_argument("--base-url", default=None, help="target fleet; default: host one in-process")
+    load_p.add_argument("--concurrency", type=int, default=200)
+    load_p.add_argument("--mode", choices=("power", "send_api"), default="send_api")
+    load_p.add_argument("--decide", action="store_true", help="run the forecast decision first, dispatch only when /decision would start (green, or yellow after 12 orange/red)")
+    load_p.add_argument("--objective", default="co2")
+    args = parser.parse_args()
+
+    if args.command == "serve":
+        fleet = Fleet(args.devices, args.latency_ms, args.jitter_ms, args.failure_rate, args.power_w, seed=args.seed)
+        try:
+            asyncio.run(serve(fleet, args.host, args.port))
+        except KeyboardInterrupt:
+            pass
+    else:
+        print(json.dumps(asyncio.run(load_test(args)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
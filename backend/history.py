@@ -0,0 +1,305 @@
+import os
+import re
+import shutil
+import tempfile
+import numpy as np
+import pandas as pd
+from data import clean_energy
+
+# Out-of-core ingest for multi-year SEN history. The source (xlsx or csv) is streamed in blocks
+# and ends up in a month-partitioned columnar store (parquet with pyarrow, .npz otherwise) with
+# the same columns data() returns, in compact dtypes. Peak memory is about one block plus one
+# month, whatever the length of the history.
+#
+#   pass 1: every block -> per-bucket sums and counts, staged by month (works for any row
+#           order, buckets split across blocks are merged later)
+#   pass 2: month by month in time order -> bucket means, gap interpolation (the rows after
+#           the last measured bucket are carried into the next month), score, write
+
+_TIME_COLS = {'Ora': 'hour', 'Minut': 'minute', 'Ziua': 'day', 'Luna': 'month', 'Weekday': 'weekday'}
+_QUALITY = ('ok', 'interpolat', 'lipsa')
+_PARTITION = re.compile(r"month=(\d{4}-\d{2})")
+
+
+def history_dir() -> str:
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    return os.getenv("HISTORY_STORE_DIR") or os.path.join(base_dir, "data", "history")
+
+
+def _use_parquet() -> bool:
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def iter_source_blocks(path: str, block_rows: int = 50000):
+    """Yield the raw rows of a SEN export as DataFrames of at most `block_rows` rows.
+
+    CSV goes through read_csv(chunksize=...); xlsx through openpyxl's read-only streaming
+    reader, so the workbook is never loaded whole.
+    """
+    if path.lower().endswith('.csv'):
+        yield from pd.read_csv(path, chunksize=block_rows)
+        return
+    import openpyxl
+
+    wb = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    try:
+        ws = wb.worksheets[0]
+        # SEN exports carry a wrong <dimension>; without this read-only mode sees one row
+        ws.reset_dimensions()
+        rows = ws.iter_rows(values_only=True)
+        header = [str(h) if h is not None else f"col{i}" for i, h in enumerate(next(rows, ()))]
+        block = []
+        for row in rows:
+            block.append(row[:len(header)])
+            if len(block) >= block_rows:
+                yield pd.DataFrame.from_records(block, columns=header)
+                block = []
+        if block:
+            yield pd.DataFrame.from_records(block, columns=header)
+    finally:
+        wb.close()
+
+
+def _bucket_sums(block: pd.DataFrame, step: pd.Timedelta, time_col: str = 'Data') -> pd.DataFrame:
+    """Per-bucket sum and count of every measurement column of one raw block."""
+    times = pd.to_datetime(block[time_col], errors='coerce', dayfirst=True)
+    keep = times.notna()
+    values = block.loc[keep].drop(columns=[time_col]).apply(pd.to_numeric, errors='coerce')
+    values.index = times[keep].dt.floor(step)
+    grouped = values.groupby(level=0)
+    sums = grouped.sum(min_count=1)
+    counts = grouped.count()
+    return pd.concat({'sum': sums, 'count': counts}, axis=1)
+
+
+def _write_part(df: pd.DataFrame, path: str):
+    if path.endswith('.parquet'):
+        df.to_parquet(path, index=False)
+    else:
+        np.savez(path, **{c: df[c].to_numpy() for c in df.columns})
+
+
+def _read_part(path: str, columns=None) -> pd.DataFrame:
+    if path.endswith('.parquet'):
+        return pd.read_parquet(path, columns=columns)
+    with np.load(path, allow_pickle=False) as npz:
+        names = columns or list(npz.files)
+        df = pd.DataFrame({c: npz[c] for c in names})
+    if 'Calitate' in df.columns:
+        df['Calitate'] = pd.Categorical.from_codes(df['Calitate'], _QUALITY)
+    return df
+
+
+def _finish(grid: pd.DataFrame, measured: np.ndarray, time_col: str = 'Data') -> pd.DataFrame:
+    """Score a regularized slice and downcast it to the stored dtypes."""
+    filled = grid.drop(columns=[time_col]).notna().any(axis=1).to_numpy()
+    out = grid.copy()
+    out['Calitate'] = pd.Categorical.from_codes(np.where(measured, 0, np.where(filled, 1, 2)), _QUALITY)
+    out['Scor'] = clean_energy(grid).astype(np.float32)
+    value_cols = [c for c in grid.columns if c != time_col]
+    out[value_cols] = out[value_cols].astype(np.float32)
+    for col, attr in _TIME_COLS.items():
+        out[col] = getattr(out[time_col].dt, attr).astype(np.int8)
+    return out
+
+
+def build_history_store(
+    source: str,
+    store: str | None = None,
+    step: str | None = None,
+    max_gap: int = 6,
+    block_rows: int = 50000,
+) -> dict:
+    """Stream `source` into a month-partitioned store under `store` (default data/history).
+
+    The store is rebuilt in a temporary sibling directory and replaces the old one only once the
+    whole source was read; on error the previous store is left as it was.
+
+    The rows match data(source): same 10-min grid, gap filling, 'Calitate' flags, score and
+    time features, stored as float32 / int8 / category. Returns {'rows', 'months', 'store'}.
+    """
+    store = os.path.abspath(store or history_dir())
+    parent = os.path.dirname(store)
+    os.makedirs(parent, exist_ok=True)
+    # build next to the live store and swap it in at the end, so a failed read leaves the
+    # previous store intact
+    build = tempfile.mkdtemp(prefix=f".{os.path.basename(store)}-build-", dir=parent)
+    try:
+        info = _build(source, build, step, max_gap, block_rows)
+    except BaseException:
+        shutil.rmtree(build, ignore_errors=True)
+        raise
+    old = None
+    if os.path.exists(store):
+        old = tempfile.mkdtemp(prefix=f".{os.path.basename(store)}-old-", dir=parent)
+        os.replace(store, os.path.join(old, "store"))
+    os.replace(build, store)
+    if old is not None:
+        shutil.rmtree(old, ignore_errors=True)
+    print(f"Saved {info['rows']} history rows in {len(info['months'])} monthly partitions to {store}")
+    return {**info, 'store': store}
+
+
+def _build(source: str, store: str, step, max_gap: int, block_rows: int) -> dict:
+    step = pd.Timedelta(step or os.getenv("SEN_GRID_STEP", "10min"))
+    ext = '.parquet' if _use_parquet() else '.npz'
+    staging = os.path.join(store, "_staging")
+    os.makedirs(staging)
+
+    # pass 1: raw blocks -> bucket sums/counts staged per month
+    for i, block in enumerate(iter_source_blocks(source, block_rows)):
+        sums = _bucket_sums(block, step)
+        if sums.empty:
+            continue
+        months = sums.index.strftime('%Y-%m')
+        for month, part in sums.groupby(months):
+            part = part.copy()
+            part.columns = [f"{kind}|{col}" for kind, col in part.columns]
+            part.insert(0, 'bucket', part.index)
+            month_dir = os.path.join(staging, month)
+            os.makedirs(month_dir, exist_ok=True)
+            part.reset_index(drop=True).to_pickle(os.path.join(month_dir, f"{i:05d}.pkl"))
+
+    # pass 2: month by month -> regular grid, interpolation, score, partition
+    rows, carry, n_parts = 0, None, {}
+    for month in sorted(os.listdir(staging)):
+        month_dir = os.path.join(staging, month)
+        staged = pd.concat([pd.read_pickle(os.path.join(month_dir, f)) for f in sorted(os.listdir(month_dir))])
+        totals = staged.groupby('bucket').sum(min_count=1)
+        value_cols = [c.split('|', 1)[1] for c in totals.columns if c.startswith('sum|')]
+        sums = totals[[f"sum|{c}" for c in value_cols]].to_numpy()
+        counts = totals[[f"count|{c}" for c in value_cols]].to_numpy()
+        with np.errstate(invalid='ignore', divide='ignore'):
+            means = pd.DataFrame(np.where(counts > 0, sums / counts, np.nan), index=totals.index, columns=value_cols)
+
+        if carry is not None:
+            means = pd.concat([carry, means.reindex(columns=carry.columns)])
+        raw = means.reindex(pd.date_range(means.index[0], means.index[-1], freq=step))
+        raw.index.name = 'Data'
+        measured = raw.notna().any(axis=1).to_numpy()
+        frame = raw.interpolate(method='time', limit=max_gap, limit_area='inside')
+
+        # rows from the carry start on may still be filled from the next month's values
+        last = _carry_start(raw.notna().to_numpy())
+        carry = raw.iloc[last:]
+        rows += _emit(frame.iloc[:last], measured[:last], store, ext, n_parts)
+    if carry is not None and len(carry):
+        frame = carry.interpolate(method='time', limit=max_gap, limit_area='inside')
+        rows += _emit(frame, carry.notna().any(axis=1).to_numpy(), store, ext, n_parts)
+
+    shutil.rmtree(staging, ignore_errors=True)
+    return {'rows': rows, 'months': sorted(n_parts)}
+
+
+def _carry_start(valid: np.ndarray) -> int:
+    """First row that is not final yet: from there on, every column that has a value at or
+    before that row has one in that row, so the next month can interpolate all later gaps."""
+    if not valid.any():
+        return len(valid)
+    start = len(valid) - 1
+    while True:
+        seen = valid[:start + 1]
+        has = seen.any(axis=0)
+        last_valid = start - seen[::-1].argmax(axis=0)
+        new = int(last_valid[has].min())
+        if new == start:
+            return start
+        start = new
+
+
+def _emit(frame: pd.DataFrame, measured: np.ndarray, store: str, ext: str, n_parts: dict) -> int:
+    if frame.empty:
+        return 0
+    out = _finish(frame.reset_index(), measured)
+    months = out['Data'].dt.strftime('%Y-%m')
+    for month, part in out.groupby(months, sort=True):
+        k = n_parts.get(month, 0)
+        n_parts[month] = k + 1
+        month_dir = os.path.join(store, f"month={month}")
+        os.makedirs(month_dir, exist_ok=True)
+        if ext == '.npz':
+            part = part.assign(Calitate=part['Calitate'].cat.codes.to_numpy())
+        _write_part(part.reset_index(drop=True), os.path.join(month_dir, f"part-{k:03d}{ext}"))
+    return len(out)
+
+
+def partitions(store: str | None = None) -> list[tuple[str, list[str]]]:
+    """[(month, [part files])] of a history store, oldest month first."""
+    store = store or history_dir()
+    out = []
+    for name in sorted(os.listdir(store)) if os.path.isdir(store) else []:
+        m = _PARTITION.fullmatch(name)
+        if m:
+            month_dir = os.path.join(store, name)
+            out.append((m.group(1), [os.path.join(month_dir, f) for f in sorted(os.listdir(month_dir))]))
+    return out
+
+
+def read_history(store: str | None = None, start=None, end=None, columns=None) -> pd.DataFrame:
+    """Rows with start <= Data < end, reading only the months that overlap the range."""
+    lo = pd.Timestamp(start) if start is not None else None
+    hi = pd.Timestamp(end) if end is not None else None
+    frames = []
+    for month, files in partitions(store):
+        m0 = pd.Timestamp(month + "-01")
+        if (hi is not None and m0 >= hi) or (lo is not None and m0 + pd.offsets.MonthBegin(1) <= lo):
+            continue
+        for f in files:
+            part = _read_part(f, columns)
+            mask = np.ones(len(part), dtype=bool)
+            if lo is not None:
+                mask &= (part['Data'] >= lo).to_numpy()
+            if hi is not None:
+                mask &= (part['Data'] < hi).to_numpy()
+            frames.append(part[mask])
+    if not frames:
+        return pd.DataFrame()
+    return pd.concat(frames, ignore_index=True).sort_values('Data', ignore_index=True)
+
+
+def _part_rows(path: str) -> int:
+    if path.endswith('.parquet'):
+        import pyarrow.parquet as pq
+
+        return pq.ParquetFile(path).metadata.num_rows
+    with np.load(path, allow_pickle=False) as npz:
+        return len(npz['Data'])
+
+
+def sample_history(
+    store: str | None = None,
+    max_rows: int | None = None,
+    recent_days: int = 7,
+    seed: int = 42,
+) -> pd.DataFrame:
+    """Time-stratified training sample of a history store, read one partition at a time.
+
+    The last `recent_days` are kept whole (predict_next_day and the accuracy monitor need the
+    latest rows); every month contributes the same fraction of its remaining rows, so seasons
+    stay represented in proportion. At most about `max_rows` rows (env HISTORY_SAMPLE_ROWS).
+    """
+    max_rows = max_rows or int(os.getenv("HISTORY_SAMPLE_ROWS", "200000"))
+    parts = partitions(store)
+    if not parts:
+        raise ValueError(f"History store {store or history_dir()} is empty; run build_history_store first")
+    last = max(_read_part(f, ['Data'])['Data'].max() for f in parts[-1][1])
+    cutoff = (last - pd.Timedelta(days=recent_days)).normalize() if recent_days else last + pd.Timedelta(1, 's')
+    recent = read_history(store, start=cutoff)
+    total = sum(_part_rows(f) for _, files in parts for f in files) - len(recent)
+    frac = min(1.0, max(0, max_rows - len(recent)) / total) if total > 0 else 0.0
+
+    rng = np.random.default_rng(seed)
+    frames = []
+    for _, files in parts:
+        for f in files:
+            part = _read_part(f)
+            part = part[(part['Data'] < cutoff).to_numpy()]
+            if frac < 1.0:
+                part = part[rng.random(len(part)) < frac]
+            frames.append(part)
+    frames.append(recent)
+    return pd.concat(frames, ignore_index=True).sort_values('Data', ignore_index=True)
@@ -0,0 +1,133 @@
+import argparse
+import json
+import math
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+# Peak RSS of ingest + training on a long SEN history, in-memory (data() + train) versus the
+# chunked path (history store + time-stratified sample + train). Each run uses a fresh
+# interpreter so its peak is measured alone. The chunked path passes if its peak stays flat as
+# the history grows (1 year vs --years, within HISTORY_RSS_GROWTH) and is below the in-memory
+# peak on the long history; otherwise the script exits 1. Both chunked runs train on the same
+# number of rows (--sample-rows, below the 1-year row count), so only the ingest path differs.
+#
+#   python history_bench.py --years 5
+#   HISTORY_RSS_GROWTH=0.1 python history_bench.py --years 10
+
+
+def synthesize_history(source: str, out_csv: str, years: float) -> int:
+    """Write a multi-year CSV by repeating `source`, each copy shifted by whole weeks."""
+    import pandas as pd
+
+    raw = pd.read_excel(source)
+    times = pd.to_datetime(raw['Data'], errors='coerce', dayfirst=True)
+    raw = raw[times.notna()]
+    times = times[times.notna()]
+    span = math.ceil((times.max() - times.min()).days / 7 + 1) * 7
+    copies = max(1, math.ceil(years * 365 / span))
+    rows = 0
+    for k in range(copies):
+        block = raw.copy()
+        block['Data'] = (times - pd.Timedelta(days=span * k)).dt.strftime('%d-%m-%Y %H:%M:%S')
+        block.to_csv(out_csv, mode='w' if k == 0 else 'a', header=(k == 0), index=False)
+        rows += len(block)
+    return rows
+
+
+def run_mode(mode: str, source: str, store: str, sample_rows: int):
+    """Child process: run one mode and print its stats as JSON."""
+    from model import train
+
+    t0 = time.perf_counter()
+    if mode == "memory":
+        from data import data
+
+        df = data(source)
+    else:
+        from history import build_history_store, sample_history
+
+        build_history_store(source, store=store)
+        df = sample_history(store, max_rows=sample_rows)
+    t_ingest = time.perf_counter() - t0
+    train(df, compact=True)
+    print(json.dumps({
+        "mode": mode,
+        "train_rows": len(df),
+        "ingest_s": round(t_ingest, 2),
+        "total_s": round(time.perf_counter() - t0, 2),
+        # ru_maxrss is in KiB on Linux
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    }))
+
+
+def measure(mode: str, source: str, store: str, sample_rows: int) -> dict:
+    proc = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--child", mode, "--source", source,
+         "--store", store, "--sample-rows", str(sample_rows)],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        capture_output=True,
+        text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"{mode} run failed:\n{proc.stderr[-2000:]}")
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+if __name__ == "__main__":
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    parser = argparse.ArgumentParser(description="Peak RSS of in-memory vs chunked history processing")
+    parser.add_argument("--years", type=float, default=3.0)
+    parser.add_argument("--sample-rows", type=int, default=40000,
+                        help="training rows of each chunked run; must be below the 1-year row count")
+    parser.add_argument("--skip-memory", action="store_true", help="only run the chunked mode")
+    parser.add_argument("--child", choices=("memory", "chunked"), help=argparse.SUPPRESS)
+    parser.add_argument("--source", default=None, help=argparse.SUPPRESS)
+    parser.add_argument("--store", default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_mode(args.child, args.source, args.store, args.sample_rows)
+        sys.exit(0)
+
+    growth = float(os.getenv("HISTORY_RSS_GROWTH", "0.15"))
+    if args.years <= 1:
+        parser.error("--years must be more than 1 (it is compared against a 1-year history)")
+    if args.sample_rows <= 0:
+        parser.error("--sample-rows must be positive")
+    with tempfile.TemporaryDirectory() as tmp:
+        workbook = os.path.join(base_dir, "input", "Grafic_SEN (1).xlsx")
+        sources = {}
+        for years in (1.0, args.years):
+            sources[years] = os.path.join(tmp, f"history_{years:g}y.csv")
+            rows = synthesize_history(workbook, sources[years], years)
+            print(f"Synthesized {rows} raw rows (~{years:g} years)")
+            if years == 1.0 and args.sample_rows >= rows:
+                parser.error(f"--sample-rows {args.sample_rows} must be below the 1-year row count ({rows})")
+        store = os.path.join(tmp, "store")
+        short = measure("chunked", sources[1.0], store, args.sample_rows)
+        long = measure("chunked", sources[args.years], store, args.sample_rows)
+        memory = None if args.skip_memory else measure("memory", sources[args.years], store, args.sample_rows)
+
+    print(f"{'mode':<9}{'years':>6}{'train rows':>12}{'ingest s':>10}{'total s':>10}{'peak RSS MB':>13}")
+    for years, r in ((1.0, short), (args.years, long), (args.years, memory)):
+        if r is not None:
+            print(f"{r['mode']:<9}{years:>6g}{r['train_rows']:>12}{r['ingest_s']:>10.1f}{r['total_s']:>10.1f}{r['peak_rss_mb']:>13.1f}")
+
+    failures = []
+    if long['train_rows'] > short['train_rows'] * 1.05:
+        failures.append(f"chunked runs trained on {short['train_rows']} vs {long['train_rows']} rows; lower --sample-rows")
+    limit = short['peak_rss_mb'] * (1 + growth)
+    if long['peak_rss_mb'] > limit:
+        failures.append(f"chunked peak grew with history: {long['peak_rss_mb']:.1f} MB at {args.years:g} years "
+                        f"> {limit:.1f} MB (1 year + {growth:.0%})")
+    if memory is not None and long['peak_rss_mb'] >= memory['peak_rss_mb']:
+        failures.append(f"chunked peak {long['peak_rss_mb']:.1f} MB is not below in-memory {memory['peak_rss_mb']:.1f} MB")
+    if failures:
+        print("FAILED: " + "; ".join(failures))
+        sys.exit(1)
+    print(f"ok: chunked peak flat within {growth:.0%} from 1 to {args.years:g} years"
+          + ("" if memory is None else f", {memory['peak_rss_mb'] - long['peak_rss_mb']:.0f} MB below in-memory"))
@@ -1,12 +1,72 @@
 import os
+import time
+import pandas as pd
 from data import data
-from model import train, predict_next_day
-from print import plot_predictions_hour_line, print_hourly_line_colors, plot_hourly_colors_line
+from model import fit_model, predict_next_day, walk_forward, quantile_col, load_model, save_model, flatten_forest, model_info, compact_params
+from monitor import AccuracyMonitor
+from print import print_hourly_line_colors, render_charts
+from rollup import publish_rollups
+from store import store_dir, write_forecast_store
 from scor import color_by_quartiles, describe_quartiles
+from price import load_prices, align_prices, add_cost_score
+from history import build_history_store, read_history, sample_history
 
 if __name__ == "__main__":
-    df = data()
-    train_df, test_df, y_pred, y_test, model = train(df)
+    # HISTORY_CHUNKED: stream the source into the monthly history store and work from a
+    # time-stratified sample of it instead of loading the whole history (see history.py)
+    chunked = os.getenv("HISTORY_CHUNKED", "false").lower() in ("1", "true", "yes")
+    if chunked:
+        build_history_store(os.getenv("SEN_SOURCE", "input/Grafic_SEN (1).xlsx"))
+        df = sample_history()
+    else:
+        df = data(os.getenv("SEN_SOURCE", "input/Grafic_SEN (1).xlsx"))
+    # Optional walk-forward evaluation (time-ordered folds, trained in parallel)
+    if os.getenv("WALK_FORWARD", "false").lower() in ("1", "true", "yes"):
+        walk_forward(
+            df,
+            n_folds=int(os.getenv("WF_FOLDS", "5")),
+            mode=os.getenv("WF_MODE", "expanding"),
+            n_jobs=int(os.getenv("N_JOBS", "-1")),
+        )
+    # Join the newly arrived actual scores to earlier forecasts. The saved model is reused unless
+    # accuracy drifted, it is older than MODEL_MAX_AGE_DAYS (so history keeps flowing in even
+    # when no actuals match), it was trained with other settings, or RETRAIN=true.
+    # every change to the monitor state is a locked reload-apply-save, so actuals POSTed to
+    # /accuracy while this run trains are not overwritten
+    monitor, matched = AccuracyMonitor.update(lambda m: m.ingest_actuals(df))
+    drifted, reasons = monitor.drift()
+    print(f"Forecast accuracy: {monitor.metrics()} (+{matched} new actuals)")
+    # MODEL_COMPACT: bounded, float32 forest; MODEL_FLAT: save it as flat arrays for inference
+    compact = os.getenv("MODEL_COMPACT", "false").lower() in ("1", "true", "yes")
+    flat = os.getenv("MODEL_FLAT", "false").lower() in ("1", "true", "yes")
+    settings = {'compact': compact, 'flat': flat, **(compact_params() if compact else {})}
+    max_age_days = float(os.getenv("MODEL_MAX_AGE_DAYS", "7"))
+
+    info = model_info()
+    if os.getenv("RETRAIN", "false").lower() in ("1", "true", "yes"):
+        reasons = ["RETRAIN=true"]
+    elif drifted:
+        reasons = ["drift: " + "; ".join(reasons)]
+    elif info is None:
+        reasons = ["no saved model"]
+    elif info.get('settings') != settings:
+        reasons = [f"settings changed: {info.get('settings')} -> {settings}"]
+    elif time.time() - info.get('trained_at', 0) > max_age_days * 86400:
+        reasons = [f"model older than {max_age_days:g} days"]
+    else:
+        reasons = []
+    model = None if reasons else load_model()
+    if model is None:
+        print("Retraining: " + ("; ".join(reasons) or "saved model unreadable"))
+        # the production model learns from all rows; walk_forward (WALK_FORWARD=true) is the validation
+        model = fit_model(df, compact=compact)
+        if flat:
+            model = flatten_forest(model)
+        save_model(model, settings=settings)
+        # errors of the old model no longer describe the new one
+        AccuracyMonitor.update(lambda m: m.reset_window())
+    else:
+        print("No drift; reusing the saved model")
     # Optional next-day prediction path controlled by env flag
     if os.getenv("PREDICT_NEXT_DAY", "false").lower() in ("1", "true", "yes"): 
         # default output directory is the project 'data' folder
@@ -18,7 +78,18 @@ if __name__ == "__main__":
         except Exception as e:
             print(f"Warning: could not create output directory {out_dir}: {e}")
 
-        next_day_df = predict_next_day(df, model)
+        # forecast quantiles from the per-tree predictions; set FORECAST_QUANTILES="" to disable
+        quantiles = [float(q) for q in os.getenv("FORECAST_QUANTILES", "0.1,0.5,0.9").split(",") if q.strip()]
+        next_day_df = predict_next_day(df, model, quantiles=quantiles)
+        # Optional day-ahead prices: adds 'Pret' and the cost score 'Scor_cost' to the forecast
+        price_path = os.getenv("PRICE_CSV") or os.path.join(base_dir, "input", "prices.csv")
+        if os.path.exists(price_path):
+            try:
+                prices = load_prices(price_path)
+                next_day_df = add_cost_score(align_prices(next_day_df, prices))
+                print(f"Aligned day-ahead prices from {price_path}")
+            except Exception as e:
+                print(f"Warning: could not load prices from {price_path}: {e}")
         # show a small sample
         print("\nNext-day predictions (head):")
         print(next_day_df.head())
@@ -35,32 +106,65 @@ if __name__ == "__main__":
         except Exception as e:
             print(f"Warning: could not save predictions to {out_path}: {e}")
 
-        # save hourly line chart as well
-        hour_line_out = os.getenv("NEXT_DAY_HOURLY_LINE") or os.path.join(out_dir, f"next_day_predictions_hourly_{next_day_str}.png")
-        try:
-            plot_predictions_hour_line(next_day_df, save_path=hour_line_out, show=False)
-        except Exception as e:
-            print(f"Warning: could not generate hourly line plot {hour_line_out}: {e}")
-
         # Add quartile-based colors to next-day predictions and save
+        next_day_colored = None
         try:
-            next_day_colored = color_by_quartiles(next_day_df.copy(), score_col='Scor_pred', out_col='Color')
+            lower_col = quantile_col(min(quantiles)) if quantiles and min(quantiles) < 0.5 else None
+            next_day_colored = color_by_quartiles(next_day_df.copy(), score_col='Scor_pred', out_col='Color', lower_col=lower_col)
             colored_path = os.getenv("NEXT_DAY_COLORED_OUT") or os.path.join(out_dir, f"next_day_predictions_colored_{next_day_str}.csv")
             next_day_colored.to_csv(colored_path, index=False)
             print(f"Saved colored next-day predictions to {colored_path}")
         except Exception as e:
             print(f"Warning: could not color predictions: {e}")
 
+        # Keep the published forecast so its accuracy can be scored when the actuals arrive
+        try:
+            if next_day_colored is not None:
+                AccuracyMonitor.update(lambda m: m.register_forecast(next_day_colored, score_col='Scor_pred'))
+        except Exception as e:
+            print(f"Warning: could not register forecast for monitoring: {e}")
+
+        # Compact binary copy of the forecast streamed by /forecast
+        try:
+            if next_day_colored is not None:
+                write_forecast_store(next_day_colored, os.path.join(store_dir(), f"forecast_{next_day_str}.npy"))
+        except Exception as e:
+            print(f"Warning: could not write forecast store: {e}")
+
+        # Precompute the 10-min/hour/day/week rollups served by /timeline
+        try:
+            if next_day_colored is not None:
+                publish_rollups(next_day_colored, 'forecast', score_col='Scor_pred')
+            # the sample would skew the history rollups; chunked runs use the recent full months
+            history_df = read_history(start=df['Data'].max() - pd.Timedelta(days=int(os.getenv("HISTORY_ROLLUP_DAYS", "90")))) if chunked else df
+            publish_rollups(history_df, 'history', score_col='Scor', color_col=None)
+        except Exception as e:
+            print(f"Warning: could not build rollups: {e}")
+
         # Print and save hourly average score with color labels
+        hourly_colored = None
         try:
             hourly_colored = print_hourly_line_colors(next_day_df, score_col='Scor_pred', color_col='Color')
             hourly_out = os.getenv("NEXT_DAY_HOURLY_COLORS_OUT") or os.path.join(out_dir, f"hourly_line_colors_{next_day_str}.csv")
             hourly_colored.to_csv(hourly_out, index=False)
             print(f"Saved hourly color table to {hourly_out}")
-            # Save a line chart from the hourly colored CSV
-            hourly_line_out = os.getenv("NEXT_DAY_HOURLY_COLORS_PLOT") or os.path.join(out_dir, f"hourly_line_colors_{next_day_str}.png")
-            plot_hourly_colors_line(hourly_colored, hour_col='Ora', score_col='Scor_pred', color_col='Color', save_path=hourly_line_out, show=False)
         except Exception as e:
             print(f"Warning: could not generate hourly color labels: {e}")
 
+        # Render the hourly charts (skipped if this forecast was already rendered)
+        # and the JSON chart series used by the frontend
+        hour_line_out = os.getenv("NEXT_DAY_HOURLY_LINE") or os.path.join(out_dir, f"next_day_predictions_hourly_{next_day_str}.png")
+        hourly_line_out = os.getenv("NEXT_DAY_HOURLY_COLORS_PLOT") or os.path.join(out_dir, f"hourly_line_colors_{next_day_str}.png")
+        series_out = os.getenv("NEXT_DAY_SERIES_JSON") or os.path.join(out_dir, f"chart_series_{next_day_str}.json")
+        try:
+            render_charts(
+                next_day_colored if next_day_colored is not None else next_day_df,
+                hour_line_path=hour_line_out,
+                hourly_colors_path=hourly_line_out,
+                series_path=series_out,
+                hourly=hourly_colored,
+            )
+        except Exception as e:
+            print(f"Warning: could not render charts: {e}")
+
 '''Run with: PREDICT_NEXT_DAY=true python3 /home/tibi/Proiecte/Sustenability/main.py'''
\ No newline at end of file
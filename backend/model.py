@@ -1,60 +1,280 @@
-from sklearn.model_selection import train_test_split
-from sklearn.ensemble import RandomForestRegressor
-from sklearn.metrics import r2_score, mean_squared_error
-import numpy as np
+from __future__ import annotations
 
-try:
-    # sklearn >=1.4 provides this helper
-    from sklearn.metrics import root_mean_squared_error as sk_rmse
-except Exception:  # pragma: no cover
-    sk_rmse = None
+import hashlib
+import json
+import os
+import time
+import weakref
+from datetime import timedelta
+from typing import TYPE_CHECKING
 
+import numpy as np
 import pandas as pd
-from datetime import timedelta
 
-def train(df):
-    # split
-    train_df, test_df = train_test_split(df, test_size=0.285, random_state=42)
+# sklearn and joblib take ~1s to import; they are loaded inside the functions that need them
+if TYPE_CHECKING:
+    from sklearn.ensemble import RandomForestRegressor
+
+# columns that are never used as model inputs
+NON_FEATURE_COLS = ['Scor', 'Data']
+
+
+def _feature_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """Return the numeric feature columns used by the model.
+
+    Drops the target, datetimes and the raw SEN measurements ('...[MW]'), which are not known
+    for future slots.
+    """
+    drop = [c for c in df.columns if c in NON_FEATURE_COLS or str(c).endswith('[MW]')]
+    X = df.drop(columns=drop)
+    return X.select_dtypes(include=['number'])
+
+
+def _rmse(y_true, y_pred) -> float:
+    return float(np.sqrt(np.mean((np.asarray(y_true) - np.asarray(y_pred)) ** 2)))
+
+
+def compact_params() -> dict:
+    """Forest settings of the memory-lean model (env MODEL_MAX_DEPTH, MODEL_MIN_LEAF, MODEL_TREES)."""
+    return {
+        'max_depth': int(os.getenv("MODEL_MAX_DEPTH", "16")),
+        'min_samples_leaf': int(os.getenv("MODEL_MIN_LEAF", "5")),
+        'n_estimators': int(os.getenv("MODEL_TREES", "100")),
+    }
+
+
+def fit_model(df, compact: bool = False):
+    """Fit the random forest on every row of `df` that has a score (the production model).
+
+    No rows are held out, so nothing is scored here: validate with walk_forward(), which trains
+    each fold only on rows before its test block. compact=True as in train().
+    """
+    from sklearn.ensemble import RandomForestRegressor
 
-    # target
     if 'Scor' not in df.columns:
         raise ValueError("DataFrame must contain a 'Scor' column as target")
-    y_train = train_df['Scor']
-    y_test = test_df['Scor']
+    # rows flagged 'lipsa' by the ingest grid have no score to learn from
+    df = df.dropna(subset=['Scor'])
+    X = _feature_frame(df)
+    if X.shape[1] == 0:
+        raise ValueError('No numeric feature columns found. Ensure DataFrame has numeric features besides "Scor" and "Data"')
+    if compact:
+        # sklearn trees work in float32 internally; giving it float32 avoids a float64 copy
+        X = X.astype(np.float32)
+        model = RandomForestRegressor(random_state=42, **compact_params())
+    else:
+        model = RandomForestRegressor(random_state=42)
+    model.fit(X, df['Scor'])
+    print(f"Fitted the model on {len(df)} rows")
+    return model
 
-    # build feature matrix: drop non-feature cols like target and datetimes, then keep numeric columns
-    drop_cols = ['Scor', 'Data']
-    X_train = train_df.drop(columns=[c for c in drop_cols if c in train_df.columns], errors='ignore')
-    X_test = test_df.drop(columns=[c for c in drop_cols if c in test_df.columns], errors='ignore')
 
-    # keep only numeric features
-    X_train = X_train.select_dtypes(include=['number'])
-    X_test = X_test.select_dtypes(include=['number'])
+def train(df, compact: bool = False, shuffle: bool = True):
+    """Fit the random forest on a 71.5/28.5 split and print R2/RMSE on the held-out part.
 
-    # ensure we have a 2D array (DataFrame). If only a single numeric column exists, select_dtypes returns a DataFrame.
-    if X_train.shape[1] == 0:
-        raise ValueError('No numeric feature columns found. Ensure DataFrame has numeric features besides "Scor" and "Data"')
+    The split is random by default; shuffle=False holds out the last 28.5% of the rows in time
+    order instead, so adjacent 10-minute rows cannot leak from the holdout into training.
+    compact=True bounds tree depth and leaf size (see compact_params) and fits on float32
+    features, which shrinks the model by orders of magnitude for a small loss in accuracy.
+    """
+    from sklearn.model_selection import train_test_split
+    from sklearn.metrics import r2_score
 
-    model = RandomForestRegressor(random_state=42)
-    model.fit(X_train, y_train)
+    # rows flagged 'lipsa' by the ingest grid have no score to learn from
+    if 'Scor' in df.columns:
+        df = df.dropna(subset=['Scor'])
+    # split
+    if not shuffle and 'Data' in df.columns:
+        df = df.sort_values('Data', kind='stable')
+    train_df, test_df = train_test_split(df, test_size=0.285, random_state=42, shuffle=shuffle)
+
+    model = fit_model(train_df, compact=compact)
+    y_test = test_df['Scor']
+    X_test = _feature_frame(test_df)
+    if compact:
+        X_test = X_test.astype(np.float32)
     y_pred = model.predict(X_test)
-    if sk_rmse is not None:
-        rmse = sk_rmse(y_test, y_pred)
-    else:
-        rmse = np.sqrt(np.mean((y_test - y_pred) ** 2))
+    rmse = _rmse(y_test, y_pred)
     print(f"R2: {r2_score(y_test, y_pred):.4f}")
     print(f"RMSE: {rmse:.4f}")
 
     return train_df, test_df, y_pred, y_test, model
 
 
-def predict_next_day(df: pd.DataFrame, model: RandomForestRegressor, freq: str = '10min') -> pd.DataFrame:
+def model_path() -> str:
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    return os.getenv("MODEL_PATH") or os.path.join(base_dir, "data", "model.joblib")
+
+
+def save_model(model, path: str | None = None, settings: dict | None = None) -> str:
+    """Persist a fitted model so later runs can reuse it instead of retraining.
+
+    `settings` (how it was trained) and the save time go to a '<path>.json' sidecar, read back
+    by model_info(), so callers can retrain when the settings change or the model gets old.
+    """
+    import joblib
+
+    path = path or model_path()
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp = path + ".tmp"
+    joblib.dump(model, tmp)
+    os.replace(tmp, path)
+    with open(tmp, 'w') as f:
+        json.dump({'trained_at': time.time(), 'settings': settings or {}}, f)
+    os.replace(tmp, path + ".json")
+    print(f"Saved model to {path}")
+    return path
+
+
+def model_info(path: str | None = None) -> dict | None:
+    """{'trained_at': unix seconds, 'settings': {...}} of a saved model, or None if unknown."""
+    try:
+        with open((path or model_path()) + ".json") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def load_model(path: str | None = None):
+    """The model saved by save_model(), or None if there is none (or it cannot be read)."""
+    import joblib
+
+    path = path or model_path()
+    if not os.path.exists(path):
+        return None
+    try:
+        return joblib.load(path)
+    except Exception as e:
+        print(f"Warning: could not load model from {path}: {e}")
+        return None
+
+
+class FlatForest:
+    """Inference-only copy of a fitted RandomForestRegressor as a few flat numpy arrays.
+
+    All trees' nodes are concatenated into one set of arrays (split feature, float32 threshold,
+    left/right child, float32 leaf value); `roots` holds each tree's first node. predict() moves
+    every (row, tree) pair one level down per step, for `max_depth` vectorized steps, instead
+    of walking trees one at a time. It pickles to little more than the arrays' bytes and needs
+    no sklearn at load time.
+    """
+
+    def __init__(self, feature, threshold, left, right, value, roots, max_depth, feature_names=None):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.value = value
+        self.roots = roots
+        self.max_depth = max_depth
+        self.feature_names_in_ = feature_names
+
+    @classmethod
+    def from_forest(cls, model: RandomForestRegressor) -> "FlatForest":
+        trees = [est.tree_ for est in model.estimators_]
+        sizes = np.array([t.node_count for t in trees])
+        roots = np.concatenate([[0], np.cumsum(sizes)[:-1]]).astype(np.int32)
+        left = np.concatenate([np.where(t.children_left < 0, -1, t.children_left + r) for t, r in zip(trees, roots)])
+        right = np.concatenate([np.where(t.children_right < 0, -1, t.children_right + r) for t, r in zip(trees, roots)])
+        feature = np.concatenate([np.maximum(t.feature, 0) for t in trees])
+        # largest float32 <= each threshold, so `x <= t` gives the same branch as in sklearn
+        threshold = np.concatenate([t.threshold for t in trees])
+        threshold32 = threshold.astype(np.float32)
+        rounded_up = threshold32 > threshold
+        threshold32[rounded_up] = np.nextafter(threshold32[rounded_up], np.float32(-np.inf))
+        names = getattr(model, 'feature_names_in_', None)
+        return cls(
+            feature=feature.astype(np.int16 if model.n_features_in_ < 2 ** 15 else np.int32),
+            threshold=threshold32,
+            left=left.astype(np.int32),
+            right=right.astype(np.int32),
+            value=np.concatenate([t.value[:, 0, 0] for t in trees]).astype(np.float32),
+            roots=roots,
+            max_depth=max(t.max_depth for t in trees),
+            feature_names=list(names) if names is not None else None,
+        )
+
+    @property
+    def nbytes(self) -> int:
+        return sum(a.nbytes for a in (self.feature, self.threshold, self.left, self.right, self.value, self.roots))
+
+    def _matrix(self, X) -> np.ndarray:
+        if isinstance(X, pd.DataFrame) and self.feature_names_in_ is not None:
+            X = X[self.feature_names_in_]
+        return np.asarray(X, dtype=np.float32)
+
+    def tree_predictions(self, X, chunk_rows: int = 4096) -> np.ndarray:
+        """(rows x trees) matrix of the individual tree predictions."""
+        X = self._matrix(X)
+        out = np.empty((len(X), len(self.roots)), dtype=np.float32)
+        for lo in range(0, len(X), chunk_rows):
+            xs = X[lo:lo + chunk_rows]
+            rows = np.arange(len(xs))[:, None]
+            node = np.broadcast_to(self.roots, (len(xs), len(self.roots))).copy()
+            for _ in range(self.max_depth):
+                left = self.left[node]
+                go_left = xs[rows, self.feature[node]] <= self.threshold[node]
+                node = np.where(left < 0, node, np.where(go_left, left, self.right[node]))
+            out[lo:lo + chunk_rows] = self.value[node]
+        return out
+
+    def predict(self, X) -> np.ndarray:
+        return self.tree_predictions(X).mean(axis=1, dtype=np.float64)
+
+
+def flatten_forest(model):
+    """FlatForest copy of a fitted forest (returned unchanged if it already is one)."""
+    return model if isinstance(model, FlatForest) else FlatForest.from_forest(model)
+
+
+# per-model flat array of all tree node values + per-tree offsets into it
+_node_values = weakref.WeakKeyDictionary()
+
+
+def _forest_node_values(model: RandomForestRegressor):
+    cached = _node_values.get(model)
+    if cached is None:
+        values = [est.tree_.value[:, 0, 0] for est in model.estimators_]
+        offsets = np.cumsum([0] + [len(v) for v in values[:-1]])
+        cached = (np.concatenate(values), offsets)
+        _node_values[model] = cached
+    return cached
+
+
+def quantile_col(q: float) -> str:
+    """Column name for a forecast quantile, e.g. 0.1 -> 'Scor_p10'."""
+    return f"Scor_p{int(round(q * 100))}"
+
+
+def predict_quantiles(model: RandomForestRegressor, X, quantiles=(0.1, 0.5, 0.9)) -> np.ndarray:
+    """Per-row quantiles of the individual tree predictions of a fitted random forest.
+
+    `model.apply` gives the leaf reached in every tree for every row; indexing one flat array of
+    all node values with those leaf ids yields the (rows x trees) prediction matrix in a single
+    vectorized gather. Returns an array of shape (rows, len(quantiles)).
+    """
+    if isinstance(model, FlatForest):
+        return np.quantile(model.tree_predictions(X), quantiles, axis=1).T
+    values, offsets = _forest_node_values(model)
+    leaves = model.apply(X)
+    per_tree = values[leaves + offsets]
+    return np.quantile(per_tree, quantiles, axis=1).T
+
+
+def predict_next_day(
+    df: pd.DataFrame,
+    model: RandomForestRegressor,
+    freq: str = '10min',
+    quantiles=None,
+) -> pd.DataFrame:
     """Predict Scor for the next day using time features and mean-filled numeric features.
 
     - Builds a timestamp range from the day after the last `Data` to that day's end using `freq`.
     - Constructs the same numeric feature columns used in training:
       drops 'Scor' and 'Data', keeps numeric columns; for future rows, fills with the training means.
     - Returns a DataFrame with 'Data' and 'Scor_pred'.
+    - If `quantiles` is given (e.g. (0.1, 0.5, 0.9)), also adds one column per quantile of the
+      per-tree predictions ('Scor_p10', 'Scor_p50', 'Scor_p90').
     """
     if 'Data' not in df.columns:
         raise ValueError("DataFrame must contain a 'Data' datetime column")
@@ -76,9 +296,8 @@ def predict_next_day(df: pd.DataFrame, model: RandomForestRegressor, freq: str =
     future['Weekday'] = future['Data'].dt.weekday
 
     # determine numeric feature columns from training data
-    drop_cols = ['Scor', 'Data']
-    base_features = df.drop(columns=[c for c in drop_cols if c in df.columns], errors='ignore')
-    numeric_cols = list(base_features.select_dtypes(include=['number']).columns)
+    base_features = _feature_frame(df)
+    numeric_cols = list(base_features.columns)
     if not numeric_cols:
         raise ValueError('No numeric feature columns found for prediction.')
 
@@ -95,4 +314,154 @@ def predict_next_day(df: pd.DataFrame, model: RandomForestRegressor, freq: str =
     preds = model.predict(X_future)
     out = future[['Data']].copy()
     out['Scor_pred'] = preds
-    return out
\ No newline at end of file
+    if quantiles:
+        bands = predict_quantiles(model, X_future, quantiles)
+        for i, q in enumerate(quantiles):
+            out[quantile_col(q)] = bands[:, i]
+    return out
+
+
+def walk_forward_splits(n_rows: int, n_folds: int = 5, mode: str = 'expanding', window: int | None = None):
+    """Return (train_start, train_end, test_start, test_end) row bounds for time-ordered folds.
+
+    The last part of the history is cut into `n_folds` equal, consecutive test blocks; each fold
+    trains only on rows before its test block, so no future rows leak into training.
+    - mode='expanding': train on everything from the first row up to the test block.
+    - mode='rolling': train on the `window` rows right before the test block (default: the
+      size of the first fold's training set).
+    """
+    if mode not in ('expanding', 'rolling'):
+        raise ValueError("mode must be 'expanding' or 'rolling'")
+    if n_folds < 1:
+        raise ValueError('n_folds must be >= 1')
+    block = n_rows // (n_folds + 1)
+    if block == 0:
+        raise ValueError(f'Not enough rows ({n_rows}) for {n_folds} folds')
+    first_test = n_rows - n_folds * block
+    window = window or first_test
+
+    splits = []
+    for k in range(n_folds):
+        test_start = first_test + k * block
+        test_end = test_start + block
+        train_start = 0 if mode == 'expanding' else max(0, test_start - window)
+        splits.append((train_start, test_start, test_start, test_end))
+    return splits
+
+
+def _feature_cache(df: pd.DataFrame, cache_dir: str):
+    """Build (or reuse) the time-ordered feature matrix and target as memory-mapped .npy files.
+
+    Files are keyed by a hash of the input rows, so repeated evaluations on the same data skip
+    feature construction, and worker processes share the arrays instead of receiving copies.
+    """
+    ordered = df.dropna(subset=['Scor'])
+    if 'Data' in ordered.columns:
+        ordered = ordered.dropna(subset=['Data']).sort_values('Data')
+    X = _feature_frame(ordered)
+    if X.shape[1] == 0:
+        raise ValueError('No numeric feature columns found. Ensure DataFrame has numeric features besides "Scor" and "Data"')
+    cols = list(X.columns)
+
+    digest = hashlib.sha1()
+    digest.update(','.join(cols).encode())
+    digest.update(pd.util.hash_pandas_object(X, index=False).values.tobytes())
+    digest.update(pd.util.hash_pandas_object(ordered['Scor'], index=False).values.tobytes())
+    key = digest.hexdigest()[:16]
+
+    x_path = os.path.join(cache_dir, f'wf_{key}_X.npy')
+    y_path = os.path.join(cache_dir, f'wf_{key}_y.npy')
+    if not (os.path.exists(x_path) and os.path.exists(y_path)):
+        os.makedirs(cache_dir, exist_ok=True)
+        np.save(x_path, X.to_numpy(dtype=np.float64))
+        np.save(y_path, ordered['Scor'].to_numpy(dtype=np.float64))
+    else:
+        for path in (x_path, y_path):
+            os.utime(path)
+    _prune_feature_cache(cache_dir, keep=int(os.getenv("WF_CACHE_KEEP", "2")))
+    return np.load(x_path, mmap_mode='r'), np.load(y_path, mmap_mode='r'), cols
+
+
+def _prune_feature_cache(cache_dir: str, keep: int = 2):
+    """Delete all but the `keep` most recently used feature-cache keys.
+
+    The data changes daily, so without this every day would leave another X/y pair behind.
+    """
+    keys = {}
+    for name in os.listdir(cache_dir):
+        if name.startswith('wf_') and name.endswith(('_X.npy', '_y.npy')):
+            path = os.path.join(cache_dir, name)
+            key = name[3:-6]
+            keys[key] = max(keys.get(key, 0.0), os.path.getmtime(path))
+    for key in sorted(keys, key=keys.get, reverse=True)[max(1, keep):]:
+        for suffix in ('_X.npy', '_y.npy'):
+            try:
+                os.remove(os.path.join(cache_dir, f'wf_{key}{suffix}'))
+            except OSError:
+                pass
+
+
+def _fit_fold(fold: int, X, y, bounds, random_state: int = 42) -> dict:
+    from sklearn.ensemble import RandomForestRegressor
+    from sklearn.metrics import r2_score
+
+    train_start, train_end, test_start, test_end = bounds
+    t0 = time.perf_counter()
+    model = RandomForestRegressor(random_state=random_state, n_jobs=1)
+    model.fit(X[train_start:train_end], y[train_start:train_end])
+    y_test = y[test_start:test_end]
+    y_pred = model.predict(X[test_start:test_end])
+    return {
+        'fold': fold,
+        'train_rows': train_end - train_start,
+        'test_rows': test_end - test_start,
+        'r2': float(r2_score(y_test, y_pred)),
+        'rmse': _rmse(y_test, y_pred),
+        'mae': float(np.mean(np.abs(y_test - y_pred))),
+        'seconds': time.perf_counter() - t0,
+    }
+
+
+def walk_forward(
+    df: pd.DataFrame,
+    n_folds: int = 5,
+    mode: str = 'expanding',
+    window: int | None = None,
+    n_jobs: int = -1,
+    cache_dir: str | None = None,
+):
+    """Walk-forward (rolling origin) evaluation of the forecaster, folds trained in parallel.
+
+    Unlike `train()`, which uses a random split, every fold is scored on rows strictly after
+    its training rows. Returns (per_fold DataFrame, summary dict) where the summary holds the
+    row-weighted aggregate R2/RMSE/MAE and the wall time of the whole evaluation.
+    """
+    from joblib import Parallel, delayed
+
+    if 'Scor' not in df.columns:
+        raise ValueError("DataFrame must contain a 'Scor' column as target")
+    if cache_dir is None:
+        cache_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'cache')
+
+    t0 = time.perf_counter()
+    X, y, _ = _feature_cache(df, cache_dir)
+    splits = walk_forward_splits(len(y), n_folds=n_folds, mode=mode, window=window)
+    rows = Parallel(n_jobs=n_jobs)(
+        delayed(_fit_fold)(k, X, y, bounds) for k, bounds in enumerate(splits)
+    )
+    per_fold = pd.DataFrame(rows)
+
+    w = per_fold['test_rows']
+    summary = {
+        'mode': mode,
+        'folds': len(per_fold),
+        'r2': float(np.average(per_fold['r2'], weights=w)),
+        'rmse': float(np.sqrt(np.average(per_fold['rmse'] ** 2, weights=w))),
+        'mae': float(np.average(per_fold['mae'], weights=w)),
+        'wall_seconds': time.perf_counter() - t0,
+    }
+    print("Walk-forward folds:")
+    print(per_fold.to_string(index=False))
+    print(f"Walk-forward ({mode}, {summary['folds']} folds): R2={summary['r2']:.4f} "
+          f"RMSE={summary['rmse']:.4f} MAE={summary['mae']:.4f} wall={summary['wall_seconds']:.1f}s")
+    return per_fold, summary
@@ -0,0 +1,87 @@
+import os
+import sys
+import tempfile
+import time
+from data import data
+from model import compact_params, train, flatten_forest, save_model, load_model, _feature_frame, _rmse, FlatForest
+
+# Size / load time / predict latency / accuracy of the model variants, to size API workers.
+# Accuracy is measured on a chronological holdout (the last 28.5% of the history), like
+# walk_forward, so neighbouring rows of the test period are not in the training set:
+#   python model_report.py            -> default, compact and compact+flat
+#   python model_report.py compact flat
+
+
+def in_memory_bytes(model) -> int:
+    """Bytes held by the fitted trees (node arrays and leaf values)."""
+    if isinstance(model, FlatForest):
+        return model.nbytes
+    total = 0
+    for est in model.estimators_:
+        state = est.tree_.__getstate__()
+        total += state['nodes'].nbytes + state['values'].nbytes
+    return total
+
+
+def best_ms(fn, repeat: int = 5) -> float:
+    best = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        ms = (time.perf_counter() - t0) * 1000
+        best = ms if best is None else min(best, ms)
+    return best
+
+
+def measure(name: str, model, test_df) -> dict:
+    X = _feature_frame(test_df)
+    y = test_df['Scor'].to_numpy()
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "model.joblib")
+        save_model(model, path)
+        file_bytes = os.path.getsize(path)
+        load_ms = best_ms(lambda: load_model(path), repeat=3)
+    pred = model.predict(X)
+    ss_tot = float(((y - y.mean()) ** 2).sum())
+    return {
+        'variant': name,
+        'file_mb': file_bytes / 1e6,
+        'memory_mb': in_memory_bytes(model) / 1e6,
+        'load_ms': load_ms,
+        'predict_1_ms': best_ms(lambda: model.predict(X.iloc[:1])),
+        'predict_day_ms': best_ms(lambda: model.predict(X.iloc[:144])),
+        'predict_test_ms': best_ms(lambda: model.predict(X), repeat=3),
+        'rmse': _rmse(y, pred),
+        'r2': 1 - float(((y - pred) ** 2).sum()) / ss_tot,
+    }
+
+
+if __name__ == "__main__":
+    variants = sys.argv[1:] or ["default", "compact", "flat"]
+    df = data()
+    rows = []
+    compact_model = None
+    for name in variants:
+        if name == "default":
+            _, test_df, _, _, model = train(df, shuffle=False)
+        elif name in ("compact", "flat"):
+            if compact_model is None:
+                _, test_df, _, _, compact_model = train(df, compact=True, shuffle=False)
+            model = compact_model if name == "compact" else flatten_forest(compact_model)
+        else:
+            sys.exit(f"Unknown variant {name!r}; use default, compact or flat")
+        rows.append(measure(name, model, test_df))
+        del model
+
+    print(f"\n{'variant':<9}{'file MB':>9}{'mem MB':>9}{'load ms':>9}{'1 row ms':>10}{'144 ms':>9}{'test ms':>9}{'RMSE':>8}{'R2':>8}")
+    for r in rows:
+        print(
+            f"{r['variant']:<9}{r['file_mb']:9.1f}{r['memory_mb']:9.1f}{r['load_ms']:9.1f}"
+            f"{r['predict_1_ms']:10.2f}{r['predict_day_ms']:9.2f}{r['predict_test_ms']:9.1f}"
+            f"{r['rmse']:8.3f}{r['r2']:8.4f}"
+        )
+    print(f"({len(test_df)} test rows from {test_df['Data'].min()} on; compact = {compact_params()}, float32)")
+    if len(rows) > 1:
+        base = rows[0]
+        for r in rows[1:]:
+            print(f"{r['variant']}: {base['file_mb'] / r['file_mb']:.0f}x smaller file than {base['variant']}")
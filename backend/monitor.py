@@ -0,0 +1,231 @@
+import json
+import math
+import os
+import threading
+from collections import deque
+from contextlib import contextmanager
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process lock
+    fcntl = None
+import numpy as np
+import pandas as pd
+from scor import describe_quartiles, quartile_colors
+
+
+def default_path() -> str:
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    return os.getenv("MONITOR_STATE") or os.path.join(base_dir, "data", "monitor.json")
+
+
+def _key(ts) -> str:
+    return pd.Timestamp(ts).strftime('%Y-%m-%dT%H:%M:%S')
+
+
+@contextmanager
+def _file_lock(path: str):
+    """Exclusive lock on '<path>.lock' across processes (main.py runs and API workers)."""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path + ".lock", "w") as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+class AccuracyMonitor:
+    """Online accuracy of published forecasts against the actual scores that arrive later.
+
+    Published predictions wait in `pending` until an actual `Scor` for the same timestamp is
+    observed. Each match updates running sums over the last `window` matches, so RMSE, bias
+    and color hit rate are O(1) per update. An actual is colored with the quartiles of the
+    forecast it is compared to, so a hit means the forecast color was right.
+
+    Drift is flagged once at least `min_samples` matches exist and RMSE or |bias| exceeds its
+    threshold, or the hit rate falls below its threshold.
+
+    Predictions still pending after `window` grid steps (one week by default) are dropped, as
+    are those whose actual is missing, so the state stays bounded. Writers share the state
+    file through update(), which reloads, applies and saves under a file lock.
+    """
+
+    def __init__(
+        self,
+        window: int | None = None,
+        min_samples: int | None = None,
+        rmse_threshold: float | None = None,
+        bias_threshold: float | None = None,
+        hit_rate_threshold: float | None = None,
+    ):
+        self.window = window if window is not None else int(os.getenv("MONITOR_WINDOW", "1008"))  # one week of 10-min intervals
+        self.min_samples = min_samples if min_samples is not None else int(os.getenv("DRIFT_MIN_SAMPLES", "36"))
+        self.rmse_threshold = rmse_threshold if rmse_threshold is not None else float(os.getenv("DRIFT_RMSE", "20"))
+        self.bias_threshold = bias_threshold if bias_threshold is not None else float(os.getenv("DRIFT_BIAS", "10"))
+        self.hit_rate_threshold = hit_rate_threshold if hit_rate_threshold is not None else float(os.getenv("DRIFT_HIT_RATE", "0.35"))
+        self.step = pd.Timedelta(os.getenv("SEN_GRID_STEP", "10min"))
+        # time -> [predicted score, predicted color, q1, q2, q3]
+        self.pending: dict = {}
+        # (time, error, hit) of the last `window` matches
+        self.recent: deque = deque()
+        self._sum_err = 0.0
+        self._sum_sq = 0.0
+        self._hits = 0
+        self._lock = threading.Lock()
+
+    def register_forecast(self, df: pd.DataFrame, time_col: str = 'Data', score_col: str = 'Scor_pred'):
+        """Remember a published forecast so later actuals can be joined to it.
+
+        The color kept is the plain quartile color of the prediction, not the published 'Color'
+        (which the P10 rule may have demoted to yellow), so hits measure prediction error only.
+        """
+        q = describe_quartiles(df, score_col=score_col)
+        thresholds = [float(q['Q1']), float(q['Q2']), float(q['Q3'])]
+        times = pd.to_datetime(df[time_col], errors='coerce')
+        scores = pd.to_numeric(df[score_col], errors='coerce')
+        colors = quartile_colors(scores, *thresholds)
+        with self._lock:
+            for ts, s, c in zip(times, scores, colors):
+                if pd.notna(ts) and pd.notna(s):
+                    self.pending[_key(ts)] = [float(s), str(c)] + thresholds
+        if times.notna().any():
+            # the forecast is for the coming day; actuals older than the window will not come
+            self.prune(times.min())
+
+    def prune(self, now) -> int:
+        """Drop predictions more than `window` steps older than `now`; returns how many."""
+        cutoff = _key(pd.Timestamp(now) - self.step * self.window)
+        with self._lock:
+            stale = [k for k in self.pending if k < cutoff]
+            for k in stale:
+                del self.pending[k]
+        return len(stale)
+
+    def observe(self, ts, actual: float) -> bool:
+        """Join one actual score to its pending prediction; returns True if it matched."""
+        key = _key(ts)
+        with self._lock:
+            pred = self.pending.pop(key, None)
+            # a missing actual (e.g. a 'lipsa' slot) will not arrive later either: drop the prediction
+            if pred is None or actual is None or (isinstance(actual, float) and math.isnan(actual)):
+                return False
+            score, color, q1, q2, q3 = pred
+            err = score - float(actual)
+            hit = bool(color) and str(quartile_colors([actual], q1, q2, q3)[0]) == color
+            self.recent.append((key, err, hit))
+            self._sum_err += err
+            self._sum_sq += err * err
+            self._hits += hit
+            if len(self.recent) > self.window:
+                _, old_err, old_hit = self.recent.popleft()
+                self._sum_err -= old_err
+                self._sum_sq -= old_err * old_err
+                self._hits -= old_hit
+        return True
+
+    def ingest_actuals(self, df: pd.DataFrame, time_col: str = 'Data', score_col: str = 'Scor') -> int:
+        """Observe every row of `df` that has a pending prediction; returns the number matched."""
+        if not self.pending:
+            return 0
+        keys = pd.to_datetime(df[time_col], errors='coerce').dt.strftime('%Y-%m-%dT%H:%M:%S')
+        mask = keys.isin(self.pending.keys()).to_numpy()
+        matched = 0
+        for key, actual in zip(keys[mask], pd.to_numeric(df.loc[mask, score_col], errors='coerce')):
+            matched += self.observe(key, float(actual))
+        last = keys.dropna().max() if keys.notna().any() else None
+        if last is not None:
+            self.prune(last)
+        return matched
+
+    def reset_window(self):
+        """Forget the rolling errors (e.g. after retraining); pending predictions are kept."""
+        with self._lock:
+            self.recent.clear()
+            self._sum_err = self._sum_sq = 0.0
+            self._hits = 0
+
+    def metrics(self) -> dict:
+        with self._lock:
+            n = len(self.recent)
+            out = {'samples': n, 'pending': len(self.pending), 'window': self.window}
+            if n:
+                out.update({
+                    'rmse': round(math.sqrt(max(0.0, self._sum_sq / n)), 4),
+                    'bias': round(self._sum_err / n, 4),
+                    'hit_rate': round(self._hits / n, 4),
+                    'since': self.recent[0][0],
+                    'until': self.recent[-1][0],
+                })
+            return out
+
+    def drift(self) -> tuple[bool, list]:
+        """(drifted, reasons) against the configured thresholds."""
+        m = self.metrics()
+        if m['samples'] < self.min_samples:
+            return False, []
+        reasons = []
+        if m['rmse'] > self.rmse_threshold:
+            reasons.append(f"rmse {m['rmse']:.2f} > {self.rmse_threshold}")
+        if abs(m['bias']) > self.bias_threshold:
+            reasons.append(f"|bias| {abs(m['bias']):.2f} > {self.bias_threshold}")
+        if m['hit_rate'] < self.hit_rate_threshold:
+            reasons.append(f"hit rate {m['hit_rate']:.2f} < {self.hit_rate_threshold}")
+        return bool(reasons), reasons
+
+    def report(self) -> dict:
+        drifted, reasons = self.drift()
+        return {
+            **self.metrics(),
+            'drift': drifted,
+            'reasons': reasons,
+            'thresholds': {
+                'rmse': self.rmse_threshold,
+                'bias': self.bias_threshold,
+                'hit_rate': self.hit_rate_threshold,
+                'min_samples': self.min_samples,
+            },
+        }
+
+    def save(self, path: str | None = None):
+        path = path or default_path()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._lock:
+            state = {'pending': self.pending, 'recent': list(self.recent)}
+        tmp = path + ".tmp"
+        with open(tmp, 'w') as f:
+            json.dump(state, f)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str | None = None, **kwargs) -> "AccuracyMonitor":
+        """Restore a monitor from `path` (a fresh one if the file does not exist)."""
+        mon = cls(**kwargs)
+        try:
+            with open(path or default_path()) as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return mon
+        mon.pending = state.get('pending', {})
+        for key, err, hit in state.get('recent', [])[-mon.window:]:
+            mon.recent.append((key, err, bool(hit)))
+        errs = np.array([e for _, e, _ in mon.recent], dtype=float)
+        mon._sum_err = float(errs.sum())
+        mon._sum_sq = float((errs ** 2).sum())
+        mon._hits = sum(h for _, _, h in mon.recent)
+        return mon
+
+    @classmethod
+    def update(cls, fn, path: str | None = None, **kwargs):
+        """Reload the state, apply fn(monitor) and save it, all under the state file's lock.
+
+        Returns (monitor, fn's result). Use this instead of load() ... save() around long work,
+        so actuals recorded by another process in between are not overwritten.
+        """
+        path = path or default_path()
+        with _file_lock(path):
+            mon = cls.load(path, **kwargs)
+            result = fn(mon)
+            mon.save(path)
+        return mon, result
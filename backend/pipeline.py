@@ -0,0 +1,164 @@
+import argparse
+import contextlib
+import glob
+import json
+import os
+import re
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+# Nightly batch over several regions / data sources: every workbook found in the input directory
+# is one region and gets its own ingest -> train -> predict -> color run, in a process pool.
+# Outputs go to data/regions/<region>/, plus data/regions/summary.json with per-stage timings.
+#
+#   python pipeline.py                       # all input/*.xlsx
+#   python pipeline.py --workers 4 input/ro_*.xlsx
+
+
+def region_name(path: str) -> str:
+    """Output namespace of an input file, e.g. 'input/Grafic_SEN (1).xlsx' -> 'grafic_sen_1'."""
+    stem = os.path.splitext(os.path.basename(path))[0]
+    return re.sub(r"[^a-z0-9]+", "_", stem.lower()).strip("_") or "region"
+
+
+def discover_inputs(input_dir: str, pattern: str = "*.xlsx") -> list[str]:
+    """Region workbooks in `input_dir` (Excel lock files '~$...' are skipped)."""
+    paths = glob.glob(os.path.join(input_dir, pattern))
+    return sorted(p for p in paths if not os.path.basename(p).startswith("~$"))
+
+
+def run_region(path: str, out_dir: str, compact: bool = True, quantiles=(0.1, 0.5, 0.9)) -> dict:
+    """Run one region end to end and write its outputs to `out_dir`.
+
+    Never raises: failures are returned in the result so one bad workbook does not stop the batch.
+    The region's own log (training metrics, warnings) goes to `out_dir`/run.log.
+    """
+    from data import data
+    from model import train, predict_next_day, quantile_col, flatten_forest, save_model, _rmse
+    from scor import color_by_quartiles
+    from store import write_forecast_store
+
+    result = {"region": region_name(path), "input": path, "out_dir": out_dir, "stages": {}}
+    os.makedirs(out_dir, exist_ok=True)
+    stage = None
+    t_start = time.perf_counter()
+    with open(os.path.join(out_dir, "run.log"), "w") as log, contextlib.redirect_stdout(log):
+        try:
+            def timed(name, fn):
+                nonlocal stage
+                stage = name
+                t0 = time.perf_counter()
+                out = fn()
+                result["stages"][name] = round(time.perf_counter() - t0, 3)
+                return out
+
+            df = timed("ingest", lambda: data(path))
+            _, _, y_pred, y_test, model = timed("train", lambda: train(df, compact=compact))
+            if compact:
+                model = flatten_forest(model)
+            pred = timed("predict", lambda: predict_next_day(df, model, quantiles=list(quantiles)))
+            lower_col = quantile_col(min(quantiles)) if quantiles and min(quantiles) < 0.5 else None
+            colored = timed("color", lambda: color_by_quartiles(pred, score_col='Scor_pred', out_col='Color', lower_col=lower_col))
+
+            day = colored['Data'].dt.date.iloc[0].isoformat()
+
+            def write():
+                csv_path = os.path.join(out_dir, f"next_day_predictions_colored_{day}.csv")
+                colored.to_csv(csv_path, index=False)
+                write_forecast_store(colored, os.path.join(out_dir, f"forecast_{day}.npy"))
+                save_model(model, os.path.join(out_dir, "model.joblib"))
+                return csv_path
+
+            result["forecast"] = timed("write", write)
+            result.update({
+                "ok": True,
+                "day": day,
+                "rows": len(df),
+                "rmse": round(_rmse(y_test, y_pred), 4),
+                "colors": colored['Color'].value_counts().to_dict(),
+            })
+        except Exception as e:
+            result.update({"ok": False, "failed_stage": stage, "error": str(e)})
+            print(traceback.format_exc())
+    result["seconds"] = round(time.perf_counter() - t_start, 3)
+    return result
+
+
+def run_pipeline(
+    paths: list[str],
+    out_root: str,
+    workers: int | None = None,
+    compact: bool = True,
+    quantiles=(0.1, 0.5, 0.9),
+) -> dict:
+    """Run every region in a process pool and write `out_root`/summary.json.
+
+    Memory is bounded by `workers` (default PIPELINE_WORKERS or CPU count): each worker holds
+    one region at a time and is replaced after every region (max_tasks_per_child=1), so a large
+    region's memory is returned to the OS before the next one starts.
+    """
+    if workers is None:
+        workers = int(os.getenv("PIPELINE_WORKERS", str(os.cpu_count() or 1)))
+    workers = max(1, min(workers, len(paths) or 1))
+    names = [region_name(p) for p in paths]
+    if len(set(names)) != len(names):
+        raise ValueError(f"Input files map to the same region name: {names}")
+
+    t0 = time.perf_counter()
+    results = []
+    with ProcessPoolExecutor(max_workers=workers, max_tasks_per_child=1) as pool:
+        futures = {
+            pool.submit(run_region, p, os.path.join(out_root, name), compact, tuple(quantiles)): name
+            for p, name in zip(paths, names)
+        }
+        for fut in as_completed(futures):
+            try:
+                res = fut.result()
+            except Exception as e:  # worker crashed (e.g. killed for memory)
+                res = {"region": futures[fut], "ok": False, "error": repr(e), "stages": {}}
+            results.append(res)
+            status = "ok" if res.get("ok") else f"FAILED ({res.get('failed_stage')}: {res.get('error')})"
+            print(f"{res['region']:<24} {res.get('seconds', 0):8.1f} s  {status}")
+
+    results.sort(key=lambda r: r["region"])
+    stage_totals = {}
+    for res in results:
+        for name, seconds in res.get("stages", {}).items():
+            stage_totals[name] = round(stage_totals.get(name, 0.0) + seconds, 3)
+    summary = {
+        "regions": len(results),
+        "failed": [r["region"] for r in results if not r.get("ok")],
+        "workers": workers,
+        "compact": compact,
+        "wall_seconds": round(time.perf_counter() - t0, 3),
+        "stage_seconds": stage_totals,
+        "results": results,
+    }
+    os.makedirs(out_root, exist_ok=True)
+    with open(os.path.join(out_root, "summary.json"), "w") as f:
+        json.dump(summary, f, indent=1, default=str)
+    return summary
+
+
+if __name__ == "__main__":
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    parser = argparse.ArgumentParser(description="Per-region ingest -> train -> predict -> color batch")
+    parser.add_argument("inputs", nargs="*", help="region workbooks; default: every *.xlsx in --input-dir")
+    parser.add_argument("--input-dir", default=os.getenv("PIPELINE_INPUT_DIR") or os.path.join(base_dir, "input"))
+    parser.add_argument("--out-dir", default=os.getenv("PIPELINE_OUT_DIR") or os.path.join(base_dir, "data", "regions"))
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--full-model", action="store_true", help="unbounded forest instead of the compact one")
+    parser.add_argument("--quantiles", default=os.getenv("FORECAST_QUANTILES", "0.1,0.5,0.9"))
+    args = parser.parse_args()
+
+    paths = args.inputs or discover_inputs(args.input_dir)
+    if not paths:
+        raise SystemExit(f"No region inputs found in {args.input_dir}")
+    quantiles = tuple(float(q) for q in args.quantiles.split(",") if q.strip())
+    summary = run_pipeline(paths, args.out_dir, args.workers, compact=not args.full_model, quantiles=quantiles)
+    stages = ", ".join(f"{k}={v:.1f}s" for k, v in summary["stage_seconds"].items())
+    print(f"{summary['regions']} regions in {summary['wall_seconds']:.1f} s on {summary['workers']} workers ({stages})")
+    print(f"Summary: {os.path.join(args.out_dir, 'summary.json')}")
+    if summary["failed"]:
+        raise SystemExit(f"Failed regions: {', '.join(summary['failed'])}")
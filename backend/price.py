@@ -0,0 +1,120 @@
+import os
+from typing import cast
+import numpy as np
+import pandas as pd
+from scor import color_by_quartiles
+
+OBJECTIVES = ('co2', 'cost', 'blend')
+
+
+def load_prices(path: str, time_col: str = 'Data', price_col: str = 'Pret') -> pd.DataFrame:
+    """Load a day-ahead price file (CSV stand-in for the OPCOM/ENTSO-E feed).
+
+    Expects one row per delivery period with a start timestamp `time_col` and a price
+    `price_col` (lei/MWh). Rows with an invalid timestamp or price are dropped.
+    Returns a DataFrame [time_col, price_col] sorted by time.
+    """
+    prices = pd.read_csv(path)
+    for col in (time_col, price_col):
+        if col not in prices.columns:
+            raise ValueError(f"Missing '{col}' column in price file {path}")
+    prices = prices[[time_col, price_col]].copy()
+    prices[time_col] = pd.to_datetime(prices[time_col], errors='coerce')
+    prices[price_col] = pd.to_numeric(prices[price_col], errors='coerce')
+    prices = prices.dropna().sort_values(time_col)
+    return prices.drop_duplicates(subset=[time_col], keep='last').reset_index(drop=True)
+
+
+def align_prices(
+    df: pd.DataFrame,
+    prices: pd.DataFrame,
+    time_col: str = 'Data',
+    price_col: str = 'Pret',
+    tolerance: str = '1h',
+) -> pd.DataFrame:
+    """Attach to every row of `df` the price of the delivery period it falls in.
+
+    Uses a single as-of merge (last price at or before each timestamp, within `tolerance`),
+    so hourly or 15-minute prices line up with the 10-minute SEN grid without a Python loop.
+    Rows with no price in range get NaN. Row order of `df` is preserved.
+    """
+    left = df.drop(columns=[price_col], errors='ignore')
+    left[time_col] = pd.to_datetime(left[time_col], errors='coerce')
+    left['_row'] = np.arange(len(left))
+    left = left.dropna(subset=[time_col]).sort_values(time_col)
+    right = prices[[time_col, price_col]].copy()
+    # merge_asof needs identical datetime resolutions on both keys
+    right[time_col] = right[time_col].astype(left[time_col].dtype)
+    merged = pd.merge_asof(
+        left,
+        right,
+        on=time_col,
+        direction='backward',
+        tolerance=pd.Timedelta(tolerance),
+    )
+    out = df.copy()
+    out[price_col] = merged.set_index('_row')[price_col].reindex(np.arange(len(df))).to_numpy()
+    return out
+
+
+def _scale(s: pd.Series, higher_is_better: bool = True) -> pd.Series:
+    """Min-max scale to 0..100 (100 = best) over the given horizon."""
+    s = cast(pd.Series, pd.to_numeric(s, errors='coerce'))
+    lo, hi = s.min(), s.max()
+    if pd.isna(lo) or hi == lo:
+        return pd.Series(np.where(s.isna(), np.nan, 50.0), index=s.index)
+    scaled = (s - lo) / (hi - lo) * 100
+    return scaled if higher_is_better else 100 - scaled
+
+
+def add_cost_score(df: pd.DataFrame, price_col: str = 'Pret', out_col: str = 'Scor_cost') -> pd.DataFrame:
+    """Add a cost score in 0..100 where the cheapest interval of the horizon scores 100."""
+    if price_col not in df.columns:
+        raise ValueError(f"Missing '{price_col}' column in DataFrame")
+    df[out_col] = _scale(df[price_col], higher_is_better=False)
+    return df
+
+
+def blend_weights(w_co2: float | None = None, w_cost: float | None = None) -> tuple[float, float]:
+    """Resolve blend weights (defaults from SCORE_WEIGHT_CO2 / SCORE_WEIGHT_COST), normalized to sum 1."""
+    if w_co2 is None:
+        w_co2 = float(os.getenv('SCORE_WEIGHT_CO2', '0.5'))
+    if w_cost is None:
+        w_cost = float(os.getenv('SCORE_WEIGHT_COST', '0.5'))
+    total = w_co2 + w_cost
+    if w_co2 < 0 or w_cost < 0 or total <= 0:
+        raise ValueError('Score weights must be non-negative and not both zero')
+    return w_co2 / total, w_cost / total
+
+
+def apply_objective(
+    df: pd.DataFrame,
+    objective: str = 'co2',
+    score_col: str = 'Scor_pred',
+    cost_col: str = 'Scor_cost',
+    out_col: str = 'Scor_obj',
+    color_col: str = 'Color',
+    w_co2: float | None = None,
+    w_cost: float | None = None,
+) -> pd.DataFrame:
+    """Add `out_col` with the score to rank by, for objective 'co2', 'cost' or 'blend'.
+
+    - co2: the forecast score as-is; colors are left untouched.
+    - cost: the price-based score from `add_cost_score`.
+    - blend: w_co2 * scaled CO2 score + w_cost * cost score, both on 0..100.
+    For cost and blend, `color_col` is recomputed by quartiles of the new score.
+    """
+    if objective not in OBJECTIVES:
+        raise ValueError(f"Unknown objective '{objective}', use one of {', '.join(OBJECTIVES)}")
+    if objective == 'co2':
+        df[out_col] = pd.to_numeric(df[score_col], errors='coerce')
+        return df
+    if cost_col not in df.columns:
+        raise ValueError(f"Objective '{objective}' needs price data but the forecast has no '{cost_col}' column")
+
+    if objective == 'cost':
+        df[out_col] = pd.to_numeric(df[cost_col], errors='coerce')
+    else:
+        a, b = blend_weights(w_co2, w_cost)
+        df[out_col] = a * _scale(df[score_col]) + b * pd.to_numeric(df[cost_col], errors='coerce')
+    return color_by_quartiles(df, score_col=out_col, out_col=color_col)
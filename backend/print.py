@@ -1,23 +1,46 @@
-from sklearn.metrics import r2_score, mean_squared_error
-try:
-    # Prefer the new API when available to avoid deprecation warnings
-    from sklearn.metrics import root_mean_squared_error as sk_rmse
-except Exception:  # pragma: no cover
-    sk_rmse = None
-
-import matplotlib.pyplot as plt
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
 import pandas as pd
 import numpy as np
 from scor import color_by_quartiles
 
+# Headless rendering by default (cron/servers); set MPLBACKEND to override.
+# matplotlib itself is imported lazily by the plotting functions.
+os.environ.setdefault("MPLBACKEND", "Agg")
+
+
+def _pyplot():
+    import matplotlib.pyplot as plt
+    return plt
+
+
+def _hourly_mean(pred_df: pd.DataFrame, score_col: str, prefer_data: bool = True) -> pd.DataFrame:
+    """Average `score_col` per hour of day -> DataFrame ['Ora', score_col] sorted by hour.
+
+    Hours come from 'Data' (or from 'Ora' when `prefer_data` is False and it exists);
+    only the two needed columns are touched, the input frame is not copied.
+    """
+    if 'Data' in pred_df.columns and (prefer_data or 'Ora' not in pred_df.columns):
+        hours = pd.to_datetime(pred_df['Data'], errors='coerce').dt.hour.rename('Ora')
+    elif 'Ora' in pred_df.columns:
+        hours = pred_df['Ora']
+    else:
+        raise ValueError("Provide either 'Data' datetime column or 'Ora' column")
+    hourly = pred_df[score_col].groupby(hours).mean().sort_index()
+    return hourly.rename_axis('Ora').reset_index()
+
 def printf(y_test, y_pred):
     """Print regression metrics for predictions vs ground truth.
 
     - R2: coefficient of determination (1.0 is perfect, can be negative)
     - RMSE: root mean squared error (lower is better, in target units)
     """
+    from sklearn.metrics import r2_score
+
     r2 = r2_score(y_test, y_pred)
-    rmse = sk_rmse(y_test, y_pred) if sk_rmse is not None else mean_squared_error(y_test, y_pred, squared=False)
+    rmse = float(np.sqrt(np.mean((np.asarray(y_test) - np.asarray(y_pred)) ** 2)))
     print(f"R2: {r2:.4f}")
     print(f"RMSE: {rmse:.4f}")
 
@@ -40,16 +63,9 @@ def plot_predictions_hour_line(
     if score_col not in pred_df.columns:
         raise ValueError(f"Missing '{score_col}' column in predictions DataFrame")
 
-    df = pred_df.copy()
-    if 'Data' in df.columns:
-        df['Data'] = pd.to_datetime(df['Data'], errors='coerce')
-        df['Ora'] = df['Data'].dt.hour
-    elif 'Ora' not in df.columns:
-        raise ValueError("Provide either 'Data' datetime column or 'Ora' column")
-
-    hourly = df.groupby('Ora', as_index=False).agg({score_col: 'mean'})
-    hourly = hourly.set_index('Ora').sort_index().reset_index()
+    hourly = _hourly_mean(pred_df, score_col, prefer_data=True)
 
+    plt = _pyplot()
     fig, ax = plt.subplots(figsize=(10, 5))
     ax.plot(hourly['Ora'], hourly[score_col], marker='o', linewidth=2)
     ax.set_xlabel('Hour of day')
@@ -89,15 +105,7 @@ def print_hourly_line_colors(
     if score_col not in pred_df.columns:
         raise ValueError(f"Missing '{score_col}' column in predictions DataFrame")
 
-    df = pred_df.copy()
-    if 'Data' in df.columns and 'Ora' not in df.columns:
-        df['Data'] = pd.to_datetime(df['Data'], errors='coerce')
-        df['Ora'] = df['Data'].dt.hour
-    elif 'Ora' not in df.columns:
-        raise ValueError("Provide either 'Data' datetime column or 'Ora' column")
-
-    hourly = df.groupby('Ora', as_index=False)[score_col].mean()
-    hourly = hourly.set_index('Ora').sort_index().reset_index()
+    hourly = _hourly_mean(pred_df, score_col, prefer_data=False)
 
     # color by quartiles
     hourly_colored = color_by_quartiles(hourly, score_col=score_col, out_col=color_col)
@@ -130,6 +138,7 @@ def plot_hourly_colors_line(
     df = hourly_df.copy()
     df = df.sort_values(by=hour_col)
 
+    plt = _pyplot()
     fig, ax = plt.subplots(figsize=(10, 5))
     ax.plot(df[hour_col], df[score_col], color='#5A6FDC', linewidth=2, alpha=0.8)
 
@@ -165,4 +174,155 @@ def plot_hourly_colors_line(
     else:
         plt.close(fig)
 
-    return fig, ax
\ No newline at end of file
+    return fig, ax
+
+
+def _render_chart(kind: str, hourly: pd.DataFrame, score_col: str, color_col: str, path: str) -> bool:
+    """Render one chart from the precomputed hourly table (in-process or in a pool worker).
+
+    Draws to a temporary file and moves it over `path` only if it was written, so a failed save
+    leaves the previous chart in place. Returns True if `path` now holds the new chart.
+    """
+    if kind == 'hour_line':
+        fig, _ = plot_predictions_hour_line(hourly, score_col=score_col, show=False)
+        label = 'hour line plot'
+    elif kind == 'hourly_colors':
+        fig, _ = plot_hourly_colors_line(hourly, hour_col='Ora', score_col=score_col, color_col=color_col, show=False)
+        label = 'hourly line (from CSV)'
+    else:
+        raise ValueError(f"Unknown chart kind '{kind}'")
+    root, ext = os.path.splitext(path)
+    tmp = f"{root}.tmp{ext}"
+    try:
+        fig.savefig(tmp, bbox_inches='tight')
+        os.replace(tmp, path)
+    except Exception as e:
+        print(f"Warning: could not save {label} to {path}: {e}")
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        return False
+    print(f"Saved {label} to {path}")
+    return True
+
+
+def forecast_digest(pred_df: pd.DataFrame, score_col: str = 'Scor_pred', color_col: str = 'Color') -> str:
+    """Stable hash of the forecast values a chart depends on (time, score, color)."""
+    cols = [c for c in ('Data', score_col, color_col) if c in pred_df.columns]
+    digest = hashlib.sha1(','.join(cols).encode())
+    digest.update(pd.util.hash_pandas_object(pred_df[cols], index=False).values.tobytes())
+    return digest.hexdigest()
+
+
+def chart_series(
+    pred_df: pd.DataFrame,
+    hourly: pd.DataFrame,
+    score_col: str = 'Scor_pred',
+    color_col: str = 'Color',
+) -> dict:
+    """Columnar JSON-ready series for frontend charts: the 10-minute forecast and its hourly means."""
+    times = pd.to_datetime(pred_df['Data'], errors='coerce')
+    series = {
+        'time': times.dt.strftime('%Y-%m-%dT%H:%M:%S').tolist(),
+        'score': pred_df[score_col].round(2).tolist(),
+    }
+    if color_col in pred_df.columns:
+        series['color'] = pred_df[color_col].astype(str).tolist()
+    hourly_out = {
+        'hour': hourly['Ora'].astype(int).tolist(),
+        'score': hourly[score_col].round(2).tolist(),
+    }
+    if color_col in hourly.columns:
+        hourly_out['color'] = hourly[color_col].astype(str).tolist()
+    return {'scoreCol': score_col, 'series': series, 'hourly': hourly_out}
+
+
+def render_charts(
+    pred_df: pd.DataFrame,
+    hour_line_path: str | None = None,
+    hourly_colors_path: str | None = None,
+    series_path: str | None = None,
+    score_col: str = 'Scor_pred',
+    color_col: str = 'Color',
+    hourly: pd.DataFrame | None = None,
+    workers: int | None = None,
+    executor=None,
+) -> dict:
+    """Render the forecast charts once per forecast version.
+
+    - The hourly table is computed once (or passed in as `hourly`, e.g. from
+      print_hourly_line_colors) and shared by every chart.
+    - Each output records the forecast digest in a `.render_cache.json` manifest next to it;
+      outputs whose file exists with the same digest are skipped.
+    - PNGs are rendered in-process (Agg backend); pass `executor` to share one process pool
+      across many forecasts, or `workers` (or CHART_WORKERS) > 1 to use a pool of that size.
+    - `series_path` writes the chart data as JSON (see chart_series) so the frontend can draw
+      the charts without PNGs.
+
+    Returns {output_path: 'rendered' | 'cached' | 'failed'}.
+    """
+    if score_col not in pred_df.columns:
+        raise ValueError(f"Missing '{score_col}' column in predictions DataFrame")
+    digest = forecast_digest(pred_df, score_col, color_col)
+    if hourly is None:
+        hourly = color_by_quartiles(_hourly_mean(pred_df, score_col), score_col=score_col, out_col=color_col)
+
+    outputs = {k: p for k, p in (('hour_line', hour_line_path), ('hourly_colors', hourly_colors_path), ('series', series_path)) if p}
+    manifests = {}
+    status = {}
+    todo = []
+    for kind, path in outputs.items():
+        manifest_path = os.path.join(os.path.dirname(os.path.abspath(path)), '.render_cache.json')
+        if manifest_path not in manifests:
+            try:
+                with open(manifest_path) as f:
+                    manifests[manifest_path] = json.load(f)
+            except (OSError, ValueError):
+                manifests[manifest_path] = {}
+        key = f"{os.path.basename(path)}:{kind}"
+        if os.path.exists(path) and manifests[manifest_path].get(key) == digest:
+            status[path] = 'cached'
+        else:
+            todo.append((kind, path, manifest_path, key))
+
+    charts = [(kind, path) for kind, path, _, _ in todo if kind != 'series']
+    saved = {}
+    for kind, path, _, _ in todo:
+        if kind == 'series':
+            with open(path, 'w') as f:
+                json.dump(chart_series(pred_df, hourly, score_col, color_col), f)
+            print(f"Saved chart series to {path}")
+            saved[path] = True
+
+    if charts:
+        if workers is None:
+            workers = int(os.getenv('CHART_WORKERS', '1'))
+        own_pool = None
+        if executor is None and workers > 1:
+            executor = own_pool = ProcessPoolExecutor(max_workers=min(workers, len(charts)))
+        try:
+            if executor is not None:
+                futures = {p: executor.submit(_render_chart, k, hourly, score_col, color_col, p) for k, p in charts}
+                for p, fut in futures.items():
+                    saved[p] = fut.result()
+            else:
+                for k, p in charts:
+                    saved[p] = _render_chart(k, hourly, score_col, color_col, p)
+        finally:
+            if own_pool is not None:
+                own_pool.shutdown()
+
+    # only outputs actually written for this digest are recorded; a failed save stays stale
+    # in the manifest and is retried on the next run
+    for kind, path, manifest_path, key in todo:
+        if saved.get(path):
+            manifests[manifest_path][key] = digest
+            status[path] = 'rendered'
+        else:
+            status[path] = 'failed'
+    for manifest_path, manifest in manifests.items():
+        try:
+            with open(manifest_path, 'w') as f:
+                json.dump(manifest, f, indent=1)
+        except OSError as e:
+            print(f"Warning: could not write render cache {manifest_path}: {e}")
+    return status
@@ -0,0 +1,128 @@
+import bisect
+import json
+import os
+import time
+import pandas as pd
+from scor import describe_quartiles, quartile_colors
+
+# supported rollup resolutions (finest first: the SEN grid step, e.g. '10min') and data sources
+GRID_RESOLUTION = os.getenv("SEN_GRID_STEP", "10min")
+RESOLUTIONS = (GRID_RESOLUTION, 'hour', 'day', 'week')
+SOURCES = ('forecast', 'history')
+
+
+def rollup_dir() -> str:
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    return os.getenv("ROLLUP_DIR") or os.path.join(base_dir, "data", "rollups")
+
+
+def _bucket(times: pd.Series, resolution: str) -> pd.Series:
+    if resolution == GRID_RESOLUTION:
+        return times.dt.floor(pd.Timedelta(GRID_RESOLUTION))
+    if resolution == 'hour':
+        return times.dt.floor('h')
+    if resolution == 'day':
+        return times.dt.normalize()
+    if resolution == 'week':
+        # weeks start on Monday 00:00
+        return times.dt.normalize() - pd.to_timedelta(times.dt.weekday, unit='D')
+    raise ValueError(f"Unknown resolution '{resolution}', use one of {', '.join(RESOLUTIONS)}")
+
+
+def build_rollups(
+    df: pd.DataFrame,
+    score_col: str,
+    time_col: str = 'Data',
+    color_col: str | None = 'Color',
+) -> dict:
+    """Aggregate a score series into mean/min/max/count per grid step, hour, day and week.
+
+    Bucket colors use the quartiles of the full-resolution series, so an hour is 'green' when
+    its mean would be green as a single interval. At the grid resolution an existing
+    `color_col` (e.g. the published forecast colors) is kept as-is.
+    Returns {resolution: {'t': [...], 'mean': [...], 'min': [...], 'max': [...], 'count': [...], 'color': [...]}}.
+    """
+    times = pd.to_datetime(df[time_col], errors='coerce')
+    scores = pd.to_numeric(df[score_col], errors='coerce')
+    valid = times.notna() & scores.notna()
+    times, scores = times[valid], scores[valid]
+    q = describe_quartiles(pd.DataFrame({score_col: scores}), score_col=score_col)
+
+    out = {}
+    for resolution in RESOLUTIONS:
+        keys = _bucket(times, resolution)
+        agg = scores.groupby(keys).agg(['mean', 'min', 'max', 'count']).sort_index()
+        if resolution == GRID_RESOLUTION and color_col and color_col in df.columns:
+            colors = df.loc[valid, color_col].astype(str).groupby(keys).last().reindex(agg.index).tolist()
+        else:
+            colors = quartile_colors(agg['mean'], q['Q1'], q['Q2'], q['Q3']).tolist()
+        out[resolution] = {
+            't': agg.index.strftime('%Y-%m-%dT%H:%M:%S').tolist(),
+            'mean': agg['mean'].round(2).tolist(),
+            'min': agg['min'].round(2).tolist(),
+            'max': agg['max'].round(2).tolist(),
+            'count': agg['count'].astype(int).tolist(),
+            'color': colors,
+        }
+    return out
+
+
+def publish_rollups(
+    df: pd.DataFrame,
+    source: str,
+    score_col: str,
+    time_col: str = 'Data',
+    color_col: str | None = 'Color',
+    out_dir: str | None = None,
+) -> str:
+    """Build the rollups of `df` and write one JSON file per resolution under <out_dir>/<source>/.
+
+    Files are written to a temp name and renamed, so readers never see a partial rollup.
+    Returns the source directory.
+    """
+    target = os.path.join(out_dir or rollup_dir(), source)
+    os.makedirs(target, exist_ok=True)
+    built = time.strftime('%Y-%m-%dT%H:%M:%S')
+    for resolution, arrays in build_rollups(df, score_col, time_col=time_col, color_col=color_col).items():
+        path = os.path.join(target, f"{resolution}.json")
+        tmp = path + ".tmp"
+        with open(tmp, 'w') as f:
+            json.dump({'source': source, 'resolution': resolution, 'scoreCol': score_col, 'built': built, **arrays}, f)
+        os.replace(tmp, path)
+    print(f"Saved {source} rollups to {target}")
+    return target
+
+
+# (source, resolution) -> (mtime_ns, payload); rollups are re-read only after a new publish
+_loaded: dict = {}
+
+
+def load_rollup(source: str, resolution: str, out_dir: str | None = None) -> dict | None:
+    """Return the stored rollup for (source, resolution), or None if it was never published."""
+    if source not in SOURCES:
+        raise ValueError(f"Unknown source '{source}', use one of {', '.join(SOURCES)}")
+    if resolution not in RESOLUTIONS:
+        raise ValueError(f"Unknown resolution '{resolution}', use one of {', '.join(RESOLUTIONS)}")
+    path = os.path.join(out_dir or rollup_dir(), source, f"{resolution}.json")
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+    cached = _loaded.get(path)
+    if cached is None or cached[0] != mtime:
+        with open(path) as f:
+            cached = (mtime, json.load(f))
+        _loaded[path] = cached
+    return cached[1]
+
+
+def slice_rollup(rollup: dict, start: str | None = None, end: str | None = None) -> dict:
+    """Restrict a rollup's arrays to buckets with start <= t < end (ISO timestamps)."""
+    t = rollup['t']
+    lo = bisect.bisect_left(t, start) if start else 0
+    hi = bisect.bisect_left(t, end) if end else len(t)
+    out = {k: v for k, v in rollup.items() if not isinstance(v, list)}
+    for k, v in rollup.items():
+        if isinstance(v, list):
+            out[k] = v[lo:hi]
+    return out
@@ -2,7 +2,12 @@ from typing import cast
 import pandas as pd
 import numpy as np
 
-def color_by_quartiles(df: pd.DataFrame, score_col: str = 'Scor', out_col: str = 'ScorColor') -> pd.DataFrame:
+def color_by_quartiles(
+	df: pd.DataFrame,
+	score_col: str = 'Scor',
+	out_col: str = 'ScorColor',
+	lower_col: str | None = None,
+) -> pd.DataFrame:
 	"""Add a color label column based on quartiles of the score column without altering values.
 
 	Rules (customizable):
@@ -11,6 +16,9 @@ def color_by_quartiles(df: pd.DataFrame, score_col: str = 'Scor', out_col: str =
 	- Q1 <= Score < Q2 -> 'orange'
 	- Score < Q1 -> 'red'
 
+	If `lower_col` is given (e.g. the P10 forecast 'Scor_p10'), a 'green' interval whose lower
+	bound falls below Q2 is uncertain and is demoted to 'yellow'.
+
 	Returns the same DataFrame with a new `out_col` column.
 	"""
 	if score_col not in df.columns:
@@ -45,6 +53,11 @@ def color_by_quartiles(df: pd.DataFrame, score_col: str = 'Scor', out_col: str =
 
 	# Write to the requested output column name
 	df[out_col] = cast(pd.Series, s).apply(map_color)
+
+	if lower_col is not None and lower_col in df.columns and not pd.isna(q2):
+		low = cast(pd.Series, pd.to_numeric(df[lower_col], errors='coerce'))
+		uncertain = (df[out_col] == 'green') & ~(low >= q2)
+		df.loc[uncertain, out_col] = 'yellow'
 	return df
 
 
@@ -58,4 +71,19 @@ def describe_quartiles(df: pd.DataFrame, score_col: str = 'Scor') -> pd.Series:
 		'Q1': np.quantile(s, 0.25),
 		'Q2': np.quantile(s, 0.5),
 		'Q3': np.quantile(s, 0.75),
-	})
\ No newline at end of file
+	})
+
+
+def quartile_colors(values, q1: float, q2: float, q3: float) -> np.ndarray:
+	"""Vectorized color labels for `values` against fixed quartile thresholds.
+
+	Same rules as color_by_quartiles, but the thresholds come from the caller, e.g. quartiles of
+	the 10-minute series applied to hourly or daily means. NaN values are 'red'.
+	"""
+	x = np.asarray(pd.to_numeric(pd.Series(values), errors='coerce'), dtype=float)
+	with np.errstate(invalid='ignore'):
+		return np.select(
+			[x >= q3, x >= q2, x >= q1],
+			['green', 'yellow', 'orange'],
+			default='red',
+		)
@@ -0,0 +1,62 @@
+import os
+import re
+import subprocess
+import sys
+
+# entry points that cron/CLI/server start; each must import within the budget
+ENTRY_POINTS = ["use", "main", "client", "virtual_washer"]
+
+_LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def import_times(module: str) -> list[tuple[str, int, int, int]]:
+    """Run `python -X importtime -c "import <module>"` in a fresh interpreter.
+
+    Returns (package, self_us, cumulative_us, depth) for every import, in the order reported.
+    """
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=base_dir,
+        capture_output=True,
+        text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{proc.stderr[-2000:]}")
+    rows = []
+    for line in proc.stderr.splitlines():
+        m = _LINE.match(line)
+        if m:
+            self_us, cum_us, indent, name = m.groups()
+            rows.append((name, int(self_us), int(cum_us), (len(indent) - 1) // 2))
+    return rows
+
+
+def startup_ms(module: str, repeat: int = 3) -> tuple[float, list[tuple[str, int]]]:
+    """Best-of-`repeat` total import time of `module` in ms and its heaviest direct imports."""
+    best = None
+    for _ in range(repeat):
+        rows = import_times(module)
+        total = sum(cum for _, _, cum, depth in rows if depth == 0)
+        direct = [(name, cum) for name, _, cum, depth in rows if depth == 1]
+        if best is None or total < best[0]:
+            best = (total, sorted(direct, key=lambda x: -x[1]))
+    return best[0] / 1000, best[1]
+
+
+if __name__ == "__main__":
+    budget_ms = float(os.getenv("STARTUP_BUDGET_MS", "600"))
+    modules = sys.argv[1:] or ENTRY_POINTS
+    over = []
+    for module in modules:
+        total_ms, top = startup_ms(module)
+        status = "ok" if total_ms <= budget_ms else "OVER BUDGET"
+        print(f"{module:<16} {total_ms:8.1f} ms  [{status}]")
+        for name, cum in top[:5]:
+            print(f"    {name:<28} {cum / 1000:8.1f} ms")
+        if total_ms > budget_ms:
+            over.append(module)
+    print(f"Budget: {budget_ms:.0f} ms per entry point")
+    if over:
+        print("Over budget: " + ", ".join(over))
+        sys.exit(1)
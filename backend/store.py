@@ -0,0 +1,153 @@
+import json
+import os
+import re
+import numpy as np
+import pandas as pd
+
+# color labels are stored as small integer codes; 255 = unknown
+COLORS = ('red', 'orange', 'yellow', 'green')
+_NO_COLOR = 255
+_QUANTILE_COL = re.compile(r"Scor_p(\d+)")
+
+
+def store_dir() -> str:
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    return os.getenv("FORECAST_STORE_DIR") or os.path.join(base_dir, "data", "forecast")
+
+
+def write_forecast_store(
+    df: pd.DataFrame,
+    path: str,
+    time_col: str = 'Data',
+    score_col: str = 'Scor_pred',
+    color_col: str = 'Color',
+) -> str:
+    """Write a forecast as one compact, time-sorted numpy record array (.npy).
+
+    Each row holds t (datetime64[s]), score (float32), color (uint8 code into COLORS) and one
+    float32 field per quantile column ('Scor_p10' -> 'p10'). About 10 bytes per row plus
+    4 per quantile, and readers can memory-map it instead of parsing CSV.
+    """
+    times = pd.to_datetime(df[time_col], errors='coerce')
+    keep = times.notna().to_numpy()
+    quantile_cols = sorted((c for c in df.columns if _QUANTILE_COL.fullmatch(str(c))), key=lambda c: int(c[6:]))
+
+    fields = [('t', 'M8[s]'), ('score', 'f4'), ('color', 'u1')]
+    fields += [(f"p{c[6:]}", 'f4') for c in quantile_cols]
+    rec = np.empty(int(keep.sum()), dtype=fields)
+    rec['t'] = times[keep].to_numpy().astype('M8[s]')
+    rec['score'] = pd.to_numeric(df[score_col], errors='coerce').to_numpy()[keep]
+    if color_col in df.columns:
+        codes = {name: i for i, name in enumerate(COLORS)}
+        rec['color'] = df[color_col].astype(str).str.lower().map(codes).fillna(_NO_COLOR).to_numpy()[keep]
+    else:
+        rec['color'] = _NO_COLOR
+    for c in quantile_cols:
+        rec[f"p{c[6:]}"] = pd.to_numeric(df[c], errors='coerce').to_numpy()[keep]
+    rec.sort(order='t')
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, 'wb') as f:
+        np.save(f, rec)
+    os.replace(tmp, path)
+    print(f"Saved forecast store to {path}")
+    return path
+
+
+def latest_forecast_store() -> str | None:
+    """Path of the newest forecast_YYYY-MM-DD.npy in the store directory, or None."""
+    base = store_dir()
+    try:
+        files = sorted(f for f in os.listdir(base) if re.fullmatch(r"forecast_\d{4}-\d{2}-\d{2}\.npy", f))
+    except OSError:
+        return None
+    return os.path.join(base, files[-1]) if files else None
+
+
+def open_forecast_store(path: str) -> np.ndarray:
+    """Memory-map a forecast store; rows are only read from disk when accessed."""
+    return np.load(path, mmap_mode='r')
+
+
+def row_range(rec: np.ndarray, start=None, end=None) -> tuple[int, int]:
+    """Row bounds [lo, hi) of start <= t < end, by binary search on the sorted time field."""
+    t = rec['t']
+    lo = int(np.searchsorted(t, np.datetime64(pd.Timestamp(start), 's'), side='left')) if start is not None else 0
+    hi = int(np.searchsorted(t, np.datetime64(pd.Timestamp(end), 's'), side='left')) if end is not None else len(rec)
+    return lo, max(lo, hi)
+
+
+def _chunk_columns(chunk: np.ndarray, quantiles: bool) -> dict:
+    cols = {
+        'time': np.datetime_as_string(chunk['t'], unit='s').tolist(),
+        'score': np.round(chunk['score'].astype('f8'), 2).tolist(),
+        'color': [COLORS[c] if c < len(COLORS) else None for c in chunk['color'].tolist()],
+    }
+    if quantiles:
+        for name in chunk.dtype.names[3:]:
+            cols[name] = np.round(chunk[name].astype('f8'), 2).tolist()
+    return cols
+
+
+def iter_ndjson(rec: np.ndarray, start=None, end=None, quantiles: bool = True, chunk_rows: int = 1024):
+    """Yield the rows in [start, end) as NDJSON text, `chunk_rows` rows per yielded chunk."""
+    lo, hi = row_range(rec, start, end)
+    for i in range(lo, hi, chunk_rows):
+        cols = _chunk_columns(rec[i:min(i + chunk_rows, hi)], quantiles)
+        names = list(cols)
+        lines = []
+        for values in zip(*(cols[n] for n in names)):
+            row = {n: (None if isinstance(v, float) and v != v else v) for n, v in zip(names, values)}
+            lines.append(json.dumps(row))
+        yield "\n".join(lines) + "\n"
+
+
+def iter_arrow(rec: np.ndarray, start=None, end=None, quantiles: bool = True, chunk_rows: int = 1024):
+    """Yield the rows in [start, end) as an Arrow IPC stream, one record batch per chunk.
+
+    Needs pyarrow (optional dependency); raises ImportError if it is not installed.
+    """
+    import pyarrow as pa
+
+    class _Sink:
+        def __init__(self):
+            self.parts = []
+            self.closed = False
+
+        def write(self, data):
+            self.parts.append(bytes(data))
+            return len(data)
+
+        def flush(self):
+            pass
+
+        def close(self):
+            self.closed = True
+
+        def take(self) -> bytes:
+            out = b"".join(self.parts)
+            self.parts = []
+            return out
+
+    fields = [pa.field('time', pa.timestamp('s')), pa.field('score', pa.float32()), pa.field('color', pa.string())]
+    if quantiles:
+        fields += [pa.field(name, pa.float32()) for name in rec.dtype.names[3:]]
+    schema = pa.schema(fields)
+
+    sink = _Sink()
+    writer = pa.ipc.new_stream(sink, schema)
+    lo, hi = row_range(rec, start, end)
+    for i in range(lo, hi, chunk_rows):
+        chunk = rec[i:min(i + chunk_rows, hi)]
+        arrays = [
+            pa.array(chunk['t']),
+            pa.array(chunk['score']),
+            pa.array([COLORS[c] if c < len(COLORS) else None for c in chunk['color'].tolist()], pa.string()),
+        ]
+        if quantiles:
+            arrays += [pa.array(chunk[name]) for name in rec.dtype.names[3:]]
+        writer.write_batch(pa.record_batch(arrays, schema=schema))
+        yield sink.take()
+    writer.close()
+    yield sink.take()
@@ -3,7 +3,7 @@ import re
 import pandas as pd
 from datetime import datetime, timedelta
 from typing import Optional, Tuple
-from api import send_api
+from price import apply_objective
 
 def _build_intervals(df: pd.DataFrame, time_col: str = "Data") -> pd.DataFrame:
     """
@@ -70,12 +70,21 @@ def _latest_colored_csv() -> Optional[str]:
         return None
 
 
-def _round_to_10min_bucket(dt: datetime) -> datetime:
-    """Round a datetime to the nearest 10-minute bucket without rolling the hour."""
-    bucket = int((dt.minute + 5) // 10)  # nearest bucket index 0..6
-    clamped = min(5, bucket)             # clamp to 0..5 so we don't roll over to next hour
-    new_minute = clamped * 10
-    return dt.replace(minute=new_minute, second=0, microsecond=0)
+def grid_step(times: pd.Series) -> Optional[pd.Timedelta]:
+    """Return the stride if sorted `times` form a regular grid (equal, positive deltas), else None."""
+    if len(times) < 2 or times.isna().any():
+        return None
+    deltas = times.diff().iloc[1:]
+    step = deltas.iloc[0]
+    if step <= pd.Timedelta(0) or not (deltas == step).all():
+        return None
+    return pd.Timedelta(step)
+
+
+def _floor_to_step(dt: datetime, step: timedelta = timedelta(minutes=10)) -> datetime:
+    """Floor a datetime to the start of its `step` bucket (buckets aligned to midnight)."""
+    midnight = dt.replace(hour=0, minute=0, second=0, microsecond=0)
+    return midnight + ((dt - midnight) // step) * step
 
 
 def find_interval(
@@ -86,7 +95,25 @@ def find_interval(
     """
     Return the row (with Start/End) whose interval [Start, End) contains 'when'.
     If none found, return None.
+
+    On a regular grid (as written by data.to_regular_grid / predict_next_day) the row is
+    found arithmetically as (when - t0) // step; otherwise the intervals are searched.
     """
+    if time_col not in df.columns:
+        raise ValueError(f"Column '{time_col}' not found in DataFrame")
+    times = pd.to_datetime(df[time_col], errors="coerce")
+    step = grid_step(times)
+    if step is not None:
+        t0 = times.iloc[0]
+        idx = (pd.Timestamp(when) - t0) // step
+        if not 0 <= idx < len(df):
+            return None
+        row = df.iloc[idx].copy()
+        row[time_col] = times.iloc[idx]
+        row["Start"] = t0 + idx * step
+        row["End"] = row["Start"] + step
+        return row
+
     intervals = _build_intervals(df, time_col=time_col)
     mask = (intervals["Start"] <= when) & (when < intervals["End"])
     if mask.any():
@@ -94,16 +121,51 @@ def find_interval(
     return None
 
 
+def previous_colors(
+    df: pd.DataFrame,
+    start,
+    n: int = 12,
+    time_col: str = "Data",
+) -> Optional[list]:
+    """
+    Return the lower-cased colors of the `n` intervals before the one starting at `start`,
+    or None if that interval is not found or there is not enough history.
+    """
+    start_ts = start if isinstance(start, pd.Timestamp) else pd.to_datetime(start)
+    times = pd.to_datetime(df[time_col], errors="coerce")
+    step = grid_step(times)
+    if step is not None:
+        offset = start_ts - times.iloc[0]
+        if offset % step != pd.Timedelta(0):
+            return None
+        idx = offset // step
+        if not n <= idx < len(df):
+            return None
+        return df["Color"].iloc[idx - n:idx].astype(str).str.lower().tolist()
+
+    intervals = _build_intervals(df, time_col=time_col)
+    matches = intervals.index[intervals["Start"] == start_ts].tolist()
+    if not matches or matches[0] < n:
+        return None
+    idx = matches[0]
+    return intervals.loc[idx - n:idx - 1, "Color"].astype(str).str.lower().tolist()
+
+
 def color(
     csv_path: Optional[str] = None,
     when: Optional[datetime] = None,
+    objective: str = "co2",
 ) -> Tuple[bool, Optional[dict]]:
     """
     Load the colored predictions CSV and verify if the given datetime (default: now)
     falls within any [Start, End) interval in the file.
 
+    `objective` ('co2', 'cost' or 'blend') selects the score the colors are based on;
+    cost and blend need the price columns written by main.py.
+
     Returns (is_in_interval, details_dict or None).
-    details_dict includes: Start, End, Scor_pred (if available), Color (if available).
+    details_dict includes: Start, End, Scor_pred (if available), Color (if available),
+    Scor_obj (the score for the chosen objective).
     """
     if when is None:
         when = datetime.now()
@@ -113,10 +175,11 @@ def color(
     if not path or not os.path.exists(path):
         print("No colored CSV found in backend/data")
         return False, None
-    df = pd.read_csv(path)
+    df = apply_objective(pd.read_csv(path), objective)
 
-    # Snap 'when' to the nearest 10-minute bucket to match CSV cadence
-    when_bucket = _round_to_10min_bucket(when)
+    # Snap 'when' to the start of its bucket on the CSV cadence
+    step = grid_step(pd.to_datetime(df["Data"], errors="coerce")) or timedelta(minutes=10)
+    when_bucket = _floor_to_step(when, step)
     row = find_interval(df, when_bucket, time_col="Data")
     print("Current time:", when.strftime("%Y-%m-%d %H:%M:%S"))
     if row is None:
@@ -131,7 +194,7 @@ def color(
             if first_valid is not None:
                 base_day = first_valid.date()
                 aligned = datetime(base_day.year, base_day.month, base_day.day, when.hour, when.minute, 0, 0)
-                aligned = _round_to_10min_bucket(aligned)
+                aligned = _floor_to_step(aligned, step)
                 row = find_interval(df, aligned, time_col="Data")
         except Exception:
             row = None
@@ -144,6 +207,7 @@ def color(
         "End": row.get("End"),
         "Scor_pred": row.get("Scor_pred") if "Scor_pred" in row else None,
         "Color": row.get("Color") if "Color" in row else None,
+        "Scor_obj": row.get("Scor_obj") if "Scor_obj" in row else None,
     }
     # Friendly printout
     print(
@@ -152,58 +216,53 @@ def color(
     )
     return True, details
 
+
+def evaluate(
+    csv_path: Optional[str] = None,
+    when: Optional[datetime] = None,
+    objective: str = "co2",
+    n: int = 12,
+) -> Tuple[bool, Optional[dict], Optional[str], bool]:
+    """
+    The start rule of /decision: (inside, details, color, start).
+
+    Start on green; on yellow only once the `n` intervals before it were all orange or red.
+    """
+    path = csv_path or _latest_colored_csv()
+    inside, details = color(csv_path=path, when=when, objective=objective)
+    color_now = (details or {}).get("Color")
+    start = color_now == "green"
+    if color_now == "yellow":
+        try:
+            df = apply_objective(pd.read_csv(path), objective)
+            if details.get("Start"):
+                prev = previous_colors(df, details["Start"], n=n, time_col="Data")
+                start = prev is not None and all(c in {"orange", "red"} for c in prev)
+        except Exception:
+            pass
+    return bool(inside), details, color_now, start
+
+
 def send(
     dictionary: Optional[dict],
     csv_path: Optional[str] = None,
+    objective: str = "co2",
 ):
     """
-    Trigger send() based on current color and recent history:
-    - Always send for green (unchanged behavior unless requested otherwise)
-    - For yellow: only send if the previous 12 intervals were all orange or red
-    - For other colors (orange/red): do not send
+    Send the start command if the interval in `dictionary` (as returned by color()) passes
+    the start rule of evaluate(): green, or yellow after 12 orange/red intervals.
     """
-    color_now = (dictionary or {}).get("Color")
-    if color_now is None:
+    start_at = (dictionary or {}).get("Start")
+    if start_at is None:
         return
-
-    # Always send for green (kept as-is)
-    if color_now == "green":
+    _, _, _, start = evaluate(csv_path=csv_path, when=pd.Timestamp(start_at).to_pydatetime(), objective=objective)
+    if start:
+        # requests is only needed when a command is actually sent
+        from api import send_api
         send_api()
-        return
-
-    # For yellow, check previous 12 intervals in the CSV
-    if color_now == "yellow":
-        try:
-            path = csv_path or _latest_colored_csv()
-            if not path or not os.path.exists(path):
-                return
-            df = pd.read_csv(path)
-            intervals = _build_intervals(df, time_col="Data")
-            # Locate current interval by Start timestamp if available
-            if dictionary is None:
-                return
-            current_start = dictionary.get("Start")
-            if current_start is None:
-                return
-            # Normalize to Timestamp for safe comparison
-            current_start_ts = current_start if isinstance(current_start, pd.Timestamp) else pd.to_datetime(current_start)
-            # Find index of the current interval
-            matches = intervals.index[intervals["Start"] == current_start_ts].tolist()
-            if not matches:
-                return
-            idx = matches[0]
-            # Ensure we have at least 12 previous intervals
-            if idx < 12:
-                return
-            prev_colors = intervals.loc[idx-12:idx-1, "Color"].astype(str).str.lower().tolist()
-            allowed = {"orange", "red"}
-            if all(c in allowed for c in prev_colors):
-                send_api()
-                return
-        except Exception:
-            return
 
 if __name__ == "__main__":
-    ok, dictionary = color()
-    if ok:
-        send(dictionary)
\ No newline at end of file
+    inside, _, _, start = evaluate()
+    if inside and start:
+        from api import send_api
+        send_api()
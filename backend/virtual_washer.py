@@ -1,16 +1,69 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, stream_with_context
+from collections import OrderedDict
 from datetime import datetime
+import hashlib
+import threading
+import time
 import traceback
+from werkzeug.http import http_date
 import pandas as pd
 import math
 import os
 import re
+from api import send_api
+from events import get_event_log
+from monitor import AccuracyMonitor, default_path as monitor_path
+from price import apply_objective, OBJECTIVES
+from rollup import load_rollup, slice_rollup, RESOLUTIONS, SOURCES
+from store import latest_forecast_store, open_forecast_store, iter_ndjson, iter_arrow
+from use import evaluate as use_evaluate, grid_step, find_interval
 
 app = Flask(__name__)
 
 machine_state = {"power": "off"}
 
 
+def _parse_local(value: str) -> pd.Timestamp:
+    """Parse an ISO timestamp from a query/body into naive local time, like the stored forecast.
+
+    Aware values (e.g. a frontend's toISOString() '...Z') are converted to this machine's local
+    time, DST included; naive values are taken as local already. Raises ValueError if invalid.
+    """
+    ts = pd.Timestamp(value.strip().replace('Z', '+00:00'))
+    if pd.isna(ts):
+        raise ValueError(f"Invalid timestamp: {value!r}")
+    if ts.tzinfo is not None:
+        ts = pd.Timestamp(ts.to_pydatetime().astimezone().replace(tzinfo=None))
+    return ts
+
+
+def _actuate():
+    """Run send_api(); returns (duration in ms, exception or None)."""
+    t0 = time.perf_counter()
+    try:
+        send_api()
+        return (time.perf_counter() - t0) * 1000, None
+    except Exception as e:
+        return (time.perf_counter() - t0) * 1000, e
+
+
+def _record_decision(source: str, result: dict, send_ms: float | None = None):
+    """Append the outcome of a decision endpoint to the event log (non-blocking)."""
+    details = result.get("details") or {}
+    get_event_log().log(
+        "decision",
+        action=result.get("action") or ("triggered" if result.get("triggered") else "failed" if result.get("error") else "none"),
+        color=details.get("Color"),
+        score=details.get("Scor_obj", details.get("Scor_pred")),
+        triggered=result.get("triggered"),
+        duration_ms=send_ms,
+        source=source,
+        interval_start=details.get("Start"),
+        objective=result.get("objective"),
+        error=result.get("error"),
+    )
+
+
 @app.route("/")
 def home():
     return f"""
@@ -48,6 +101,7 @@ def power():
         return jsonify({"error": "Invalid state. Use ?state=on or ?state=off"}), 400
 
     machine_state["power"] = state
+    get_event_log().log("power", action=state, source="manual")
 
     # Auto‑redirect back to home after 1.5 s
     return f"""
@@ -66,7 +120,8 @@ def power():
 
 @app.route("/status", methods=["GET"])
 def status():
-    return jsonify({"power": machine_state["power"]})
+    power_now = machine_state["power"]
+    return _cached_json(("status", power_now), lambda: jsonify({"power": power_now}))
 
 
 @app.route("/auto-check", methods=["GET"])
@@ -75,12 +130,6 @@ def auto_check():
     Verifică automat scorul și pornește mașina dacă condițiile sunt îndeplinite.
     Acest endpoint poate fi apelat periodic de frontend.
     """
-    try:
-        from use import color as use_color, _build_intervals
-        from api import send_api
-    except Exception as e:
-        return jsonify({"ok": False, "error": f"Import failed: {str(e)}"}), 500
-
     result = {
         "ok": False,
         "inside_interval": False,
@@ -89,73 +138,47 @@ def auto_check():
         "triggered": False,
         "action": "none"
     }
+    send_ms = None
 
     try:
-        csv_path = _latest_colored_csv()
-        inside, details = use_color(csv_path=csv_path, when=None)
-        result["inside_interval"] = bool(inside)
-        
-        if details:
-            safe = {k: (v.isoformat() if hasattr(v, 'isoformat') else v) for k, v in details.items()}
-            result["details"] = safe
-
-        color_now = (details or {}).get("Color")
+        inside, details, color_now, start = _evaluate_decision(_latest_colored_csv(), None, "co2")
+        result["inside_interval"] = inside
+        result["details"] = details
         
         # Verifică dacă mașina este deja pornită
         if machine_state.get("power") == "on":
             result["action"] = "already_on"
             result["ok"] = True
+            _record_decision("auto-check", result)
             return jsonify(result)
         
-        # Pornește automat pentru verde
-        if color_now == "green":
-            try:
-                send_api()
+        # Aceeași regulă ca /decision: verde, sau galben după 12 intervale portocalii/roșii
+        if start:
+            send_ms, err = _actuate()
+            if err is None:
                 machine_state["power"] = "on"
                 result["triggered"] = True
-                result["action"] = "started_green"
-                print(f"🟢 AUTO-START: Green score detected, machine started!")
-            except Exception as e:
-                result["error"] = f"Failed to send API: {str(e)}"
+                if color_now == "green":
+                    result["action"] = "started_green"
+                    print("🟢 AUTO-START: Green score detected, machine started!")
+                else:
+                    result["action"] = "started_yellow_after_red"
+                    print("🟡 AUTO-START: Yellow after 12 red/orange intervals, machine started!")
+            else:
+                result["error"] = f"Failed to send API: {str(err)}"
                 result["action"] = "failed"
-        
-        # Pentru yellow, verifică ultimele 12 intervale
         elif color_now == "yellow":
-            try:
-                df = pd.read_csv(csv_path)
-                intervals = _build_intervals(df, time_col="Data")
-                current_start = details.get("Start")
-                if current_start:
-                    current_start_ts = current_start if isinstance(current_start, pd.Timestamp) else pd.to_datetime(current_start)
-                    matches = intervals.index[intervals["Start"] == current_start_ts].tolist()
-                    if matches:
-                        idx = matches[0]
-                        if idx >= 12:
-                            prev_colors = intervals.loc[idx-12:idx-1, "Color"].astype(str).str.lower().tolist()
-                            if all(c in {"orange", "red"} for c in prev_colors):
-                                try:
-                                    send_api()
-                                    machine_state["power"] = "on"
-                                    result["triggered"] = True
-                                    result["action"] = "started_yellow_after_red"
-                                    print(f"🟡 AUTO-START: Yellow after 12 red/orange intervals, machine started!")
-                                except Exception as e:
-                                    result["error"] = f"Failed to send API: {str(e)}"
-                                    result["action"] = "failed"
-                            else:
-                                result["action"] = "yellow_waiting"
-                        else:
-                            result["action"] = "yellow_not_enough_history"
-            except Exception as e:
-                result["action"] = f"yellow_check_failed: {str(e)}"
+            result["action"] = "yellow_waiting"
         else:
             result["action"] = f"color_{color_now}_no_action"
         
         result["ok"] = True
         result["power"] = machine_state.get("power")
+        _record_decision("auto-check", result, send_ms)
         return jsonify(result)
         
     except Exception as e:
+        _record_decision("auto-check", {**result, "action": "error", "error": str(e)}, send_ms)
         return jsonify({
             "ok": False, 
             "error": str(e), 
@@ -179,13 +202,116 @@ def _latest_colored_csv():
         return os.path.join(base, "next_day_predictions_colored_2025-10-18.csv")
 
 
-@app.route("/decision", methods=["POST", "GET"])
-def decision():
+# Response cache keyed by (endpoint, params, forecast version). The forecast version is the
+# latest colored CSV's name/mtime/size, so publishing a new forecast invalidates every entry.
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "256"))
+_response_cache: "OrderedDict[tuple, object]" = OrderedDict()
+_cache_lock = threading.Lock()
+_cache_version = {"forecast": None}
+
+
+def _forecast_version() -> str:
+    """Current forecast version; clears the response cache when it changed since the last call."""
+    path = _latest_colored_csv()
+    try:
+        st = os.stat(path)
+        version = f"{os.path.basename(path)}:{st.st_mtime_ns}:{st.st_size}"
+    except OSError:
+        version = "none"
+    with _cache_lock:
+        if _cache_version["forecast"] != version:
+            _response_cache.clear()
+            _cache_version["forecast"] = version
+    return version
+
+
+def _cache_get(key):
+    with _cache_lock:
+        value = _response_cache.get(key)
+        if value is not None:
+            _response_cache.move_to_end(key)
+        return value
+
+
+def _cache_put(key, value):
+    with _cache_lock:
+        _response_cache[key] = value
+        _response_cache.move_to_end(key)
+        while len(_response_cache) > RESPONSE_CACHE_SIZE:
+            _response_cache.popitem(last=False)
+
+
+def _cached_json(key: tuple, build, cache_control: str = "no-cache"):
+    """Serve the JSON response produced by `build()` from the cache, with ETag support.
+
+    Only 200 responses are cached. A request whose If-None-Match matches gets an empty 304.
+    "no-cache" lets clients keep the body but revalidate on every poll.
+    """
+    entry = _cache_get(key)
+    if entry is None:
+        resp = build()
+        if isinstance(resp, tuple) or resp.status_code != 200:
+            return resp
+        body = resp.get_data()
+        entry = (hashlib.sha1(body).hexdigest()[:20], body)
+        _cache_put(key, entry)
+
+    etag, body = entry
+    if request.if_none_match.contains(etag):
+        resp = Response(status=304)
+    else:
+        resp = Response(body, mimetype="application/json")
+    resp.set_etag(etag)
+    resp.headers["Cache-Control"] = cache_control
+    return resp
+
+
+@app.route("/cache/invalidate", methods=["POST"])
+def cache_invalidate():
+    """Drop all cached responses (e.g. called by a publish step that rewrites a forecast in place)."""
+    with _cache_lock:
+        _response_cache.clear()
+        _cache_version["forecast"] = None
+    return jsonify({"ok": True})
+
+
+def _evaluate_decision(csv_path, when, objective):
+    """Forecast side of /decision: (inside, details, color, start). Has no side effects."""
+    inside, details, color_now, start = use_evaluate(csv_path=csv_path, when=when, objective=objective)
+    safe = None
+    if details:
+        safe = {k: (v.isoformat() if hasattr(v, 'isoformat') else v) for k, v in details.items()}
+    return inside, safe, color_now, start
+
+
+def _objective_error(objective):
+    """(response, 409) when the latest forecast cannot serve `objective`, else None.
+
+    cost/blend need the 'Scor_cost' column, which main.py only adds when a price file exists.
+    """
+    if objective not in OBJECTIVES:
+        return jsonify({"ok": False, "error": f"Invalid objective. Use one of: {', '.join(OBJECTIVES)}"}), 400
+    if objective == 'co2':
+        return None
     try:
-        from use import color as use_color, _build_intervals
-        from api import send_api
+        columns = pd.read_csv(_latest_colored_csv(), nrows=0).columns
     except Exception:
-        return jsonify({"ok": False, "error": "use.py not available"}), 500
+        return None  # no forecast yet: the endpoint reports that itself
+    if 'Scor_cost' not in columns:
+        return jsonify({
+            "ok": False,
+            "error": f"Objective '{objective}' needs day-ahead prices, but the current forecast was built without them. "
+                     "Provide input/prices.csv (or PRICE_CSV, e.g. input/prices.example.csv) and rerun: make model",
+        }), 409
+    return None
+
+
+@app.route("/decision", methods=["POST", "GET"])
+def decision():
+    objective = request.args.get("objective") or ((request.json or {}).get("objective") if request.is_json else None) or "co2"
+    error = _objective_error(objective)
+    if error is not None:
+        return error
 
     result = {
         "ok": False,
@@ -200,91 +326,87 @@ def decision():
         when = None
         if when_str:
             try:
-                norm = when_str.replace('Z', '+00:00')
-                when = datetime.fromisoformat(norm)
-                if getattr(when, 'tzinfo', None) is not None:
-                    when = when.astimezone().replace(tzinfo=None)
+                when = _parse_local(when_str).to_pydatetime()
             except Exception:
                 when = None
 
+        # The forecast lookup is cached per (minute, objective, forecast version);
+        # the trigger below still runs on every call.
         csv_path = _latest_colored_csv()
-        inside, details = use_color(csv_path=csv_path, when=when)
-        result["inside_interval"] = bool(inside)
+        when_key = (when or datetime.now()).replace(second=0, microsecond=0)
+        key = ("decision", when_key.isoformat(), objective, _forecast_version())
+        evaluation = _cache_get(key)
+        if evaluation is None:
+            evaluation = _evaluate_decision(csv_path, when_key, objective)
+            _cache_put(key, evaluation)
+        inside, details, color_now, start = evaluation
+        result["inside_interval"] = inside
+        result["objective"] = objective
         if details:
-            safe = {k: (v.isoformat() if hasattr(v, 'isoformat') else v) for k, v in details.items()}
-            result["details"] = safe
+            result["details"] = dict(details)
 
-        # Decision logic: check color and trigger API if appropriate
-        should_trigger = False
-        color_now = (details or {}).get("Color")
-        
-        if color_now == "green":
-            # Always send API for green - immediate start
-            should_trigger = True
-            try:
-                send_api()
+        # Decision logic: always start for green; for yellow only after 12 orange/red intervals
+        send_ms = None
+        if start:
+            send_ms, err = _actuate()
+            if err is None:
                 machine_state["power"] = "on"
                 result["triggered"] = True
-            except Exception as e:
-                result["error"] = f"Failed to send API: {str(e)}"
-        elif color_now == "yellow":
-            # For yellow: check if previous 12 intervals were orange or red
-            try:
-                df = pd.read_csv(csv_path)
-                intervals = _build_intervals(df, time_col="Data")
-                current_start = details.get("Start")
-                if current_start:
-                    current_start_ts = current_start if isinstance(current_start, pd.Timestamp) else pd.to_datetime(current_start)
-                    matches = intervals.index[intervals["Start"] == current_start_ts].tolist()
-                    if matches:
-                        idx = matches[0]
-                        if idx >= 12:
-                            prev_colors = intervals.loc[idx-12:idx-1, "Color"].astype(str).str.lower().tolist()
-                            if all(c in {"orange", "red"} for c in prev_colors):
-                                should_trigger = True
-                                try:
-                                    send_api()
-                                    machine_state["power"] = "on"
-                                    result["triggered"] = True
-                                except Exception as e:
-                                    result["error"] = f"Failed to send API: {str(e)}"
-            except Exception:
-                pass
-        
+            else:
+                result["error"] = f"Failed to send API: {str(err)}"
+
         result["power"] = machine_state.get("power")
         result["ok"] = True
+        _record_decision("decision", result, send_ms)
         return jsonify(result)
     except Exception as e:
+        _record_decision("decision", {**result, "action": "error", "error": str(e)})
         return jsonify({"ok": False, "error": str(e), "trace": traceback.format_exc()}), 500
 
 
 @app.route("/windows", methods=["GET"])
 def windows():
-    try:
-        from use import _build_intervals as build_intervals, find_interval as find_interval
-    except Exception:
-        return jsonify({"ok": False, "error": "use.py not available"}), 500
+    objective = request.args.get('objective', 'co2')
+    error = _objective_error(objective)
+    if error is not None:
+        return error
 
+    # deltaVsNow depends on the current interval, so the current minute is part of the key
+    now_key = datetime.now().strftime('%Y-%m-%dT%H:%M')
+    params = tuple(sorted(request.args.items()))
+    key = ("windows", params, now_key, _forecast_version())
+    return _cached_json(key, lambda: _windows(objective))
+
+
+def _windows(objective):
     try:
         duration = max(1, int(request.args.get('duration', '60')))
-        window_size = max(1, math.ceil(duration / 10))
         csv_path = _latest_colored_csv()
-        df = pd.read_csv(csv_path)
+        df = apply_objective(pd.read_csv(csv_path), objective)
         df['Data'] = pd.to_datetime(df['Data'], errors='coerce')
         df = df.dropna(subset=['Data']).sort_values('Data').reset_index(drop=True)
-        intervals = build_intervals(df, time_col='Data')
+        step_minutes = (grid_step(df['Data']) or pd.Timedelta(minutes=10)) / pd.Timedelta(minutes=1)
+        window_size = max(1, math.ceil(duration / step_minutes))
 
         now = datetime.now()
         row_now = find_interval(df, now, time_col='Data')
-        if row_now is not None and 'Scor_pred' in row_now:
+        if row_now is not None and 'Scor_obj' in row_now:
             try:
-                current_score = float(row_now['Scor_pred'])
+                current_score = float(row_now['Scor_obj'])
             except Exception:
-                current_score = float(df['Scor_pred'].iloc[-1])
+                current_score = float(df['Scor_obj'].iloc[-1])
         else:
-            current_score = float(df['Scor_pred'].iloc[-1])
+            current_score = float(df['Scor_obj'].iloc[-1])
+
+        # Forecast band from quantile columns (Scor_p10/Scor_p90), if the forecast has them
+        band_cols = sorted((c for c in df.columns if re.fullmatch(r"Scor_p\d+", c)), key=lambda c: int(c[6:]))
+        spread = None
+        if len(band_cols) >= 2 and objective == 'co2':
+            spread = (pd.to_numeric(df[band_cols[-1]], errors='coerce') - pd.to_numeric(df[band_cols[0]], errors='coerce')).tolist()
+        # how many points of average score one point of band width costs in the ranking
+        risk = float(request.args.get('risk', '0.5')) if spread is not None else 0.0
 
-        scores_all = [float(x) for x in df['Scor_pred'].tolist() if pd.notna(x)]
+        scores_all = [float(x) for x in df['Scor_obj'].tolist() if pd.notna(x)]
         scores_all.sort()
         def percentile_for(value: float) -> int:
             if not scores_all:
@@ -298,13 +420,17 @@ def windows():
         n = len(df)
         for i in range(0, n - window_size + 1):
             w = df.iloc[i:i+window_size]
-            w_scores = [float(x) for x in w['Scor_pred'].tolist() if pd.notna(x)]
+            w_scores = [float(x) for x in w['Scor_obj'].tolist() if pd.notna(x)]
             if not w_scores:
                 continue
             avg = sum(w_scores) / len(w_scores)
             mn, mx = min(w_scores), max(w_scores)
             stability_value = mx - mn
             stability = 'ridicată' if stability_value <= 5 else ('medie' if stability_value <= 10 else 'scăzută')
+            uncertainty = None
+            if spread is not None:
+                w_spread = [x for x in spread[i:i+window_size] if pd.notna(x)]
+                uncertainty = sum(w_spread) / len(w_spread) if w_spread else 0.0
             start = w['Data'].iloc[0].strftime('%H:%M')
             end = w['Data'].iloc[-1].strftime('%H:%M')
             results.append({
@@ -316,13 +442,175 @@ def windows():
                 'stability': stability,
                 'stabilityValue': round(stability_value, 2),
                 'trend': 'stabil',
+                'uncertainty': round(uncertainty, 2) if uncertainty is not None else None,
+                'rankScore': round(avg - risk * (uncertainty or 0.0), 2),
             })
 
-        results.sort(key=lambda x: (-x['avgScore'], x['stabilityValue']))
-        return jsonify({ 'ok': True, 'duration': duration, 'currentScore': round(current_score, 2), 'windows': results[:3] })
+        results.sort(key=lambda x: (-round(x['rankScore']), x['stabilityValue']))
+        return jsonify({ 'ok': True, 'duration': duration, 'objective': objective, 'currentScore': round(current_score, 2), 'windows': results[:3] })
+    except Exception as e:
+        return jsonify({"ok": False, "error": str(e), "trace": traceback.format_exc()}), 500
+
+
+@app.route("/events", methods=["GET"])
+def events():
+    """Logged decisions/actuations: ?device=&kind=&start=&end= (ISO or unix seconds), ?limit= (newest first)."""
+    bounds = {}
+    try:
+        for key in ("start", "end"):
+            value = request.args.get(key)
+            if value:
+                try:
+                    bounds[key] = float(value)
+                except ValueError:
+                    # naive local datetime -> unix seconds
+                    bounds[key] = _parse_local(value).to_pydatetime().timestamp()
+        limit = min(10000, max(1, int(request.args.get("limit", "1000"))))
+    except Exception:
+        return jsonify({"ok": False, "error": "Invalid start/end/limit"}), 400
+
+    try:
+        rows = get_event_log().query(
+            device=request.args.get("device"),
+            kind=request.args.get("kind"),
+            start=bounds.get("start"),
+            end=bounds.get("end"),
+            limit=limit,
+        )
+        for row in rows:
+            row["time"] = datetime.fromtimestamp(row["ts"]).isoformat(timespec="seconds")
+        return jsonify({"ok": True, "count": len(rows), "events": rows})
+    except Exception as e:
+        return jsonify({"ok": False, "error": str(e), "trace": traceback.format_exc()}), 500
+
+
+_monitor = None
+_monitor_mtime = None
+_monitor_lock = threading.Lock()
+
+
+def _get_monitor() -> AccuracyMonitor:
+    """Accuracy monitor state, reloaded when main.py publishes a new forecast into it."""
+    global _monitor, _monitor_mtime
+    path = monitor_path()
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        mtime = None
+    with _monitor_lock:
+        if _monitor is None or mtime != _monitor_mtime:
+            _monitor = AccuracyMonitor.load(path)
+            _monitor_mtime = mtime
+        return _monitor
+
+
+@app.route("/accuracy", methods=["GET", "POST"])
+def accuracy():
+    """Rolling forecast accuracy (RMSE, bias, color hit rate) and drift status.
+
+    POST a JSON list of actuals, [{"time": "...", "score": 61.2}, ...] (or {"actuals": [...]}),
+    to join them to the published predictions before reporting.
+    """
+    global _monitor, _monitor_mtime
+    try:
+        mon = _get_monitor()
+        if request.method == "POST":
+            body = request.get_json(silent=True)
+            actuals = body.get("actuals") if isinstance(body, dict) else body
+            if not isinstance(actuals, list):
+                return jsonify({"ok": False, "error": "Body must be a list of {time, score}"}), 400
+            try:
+                points = [(a["time"], float(a["score"])) for a in actuals]
+            except (KeyError, TypeError, ValueError):
+                return jsonify({"ok": False, "error": "Each actual needs a time and a numeric score"}), 400
+            # reload-apply-save under the state file's lock, so main.py runs and other workers
+            # do not overwrite each other
+            mon, matched = AccuracyMonitor.update(lambda m: sum(m.observe(t, v) for t, v in points), monitor_path())
+            with _monitor_lock:
+                _monitor = mon
+                _monitor_mtime = os.path.getmtime(monitor_path())
+            drifted, reasons = mon.drift()
+            if drifted:
+                get_event_log().log("drift", device="model", reasons=reasons, **mon.metrics())
+            return jsonify({"ok": True, "received": len(actuals), "matched": matched, **mon.report()})
+        return jsonify({"ok": True, **mon.report()})
+    except Exception as e:
+        return jsonify({"ok": False, "error": str(e), "trace": traceback.format_exc()}), 500
+
+
+@app.route("/timeline", methods=["GET"])
+def timeline():
+    """Pre-aggregated score timeline: ?resolution=10min|hour|day|week&source=forecast|history&start=&end="""
+    resolution = request.args.get("resolution", "hour")
+    source = request.args.get("source", "forecast")
+    if resolution not in RESOLUTIONS:
+        return jsonify({"ok": False, "error": f"Invalid resolution. Use one of: {', '.join(RESOLUTIONS)}"}), 400
+    if source not in SOURCES:
+        return jsonify({"ok": False, "error": f"Invalid source. Use one of: {', '.join(SOURCES)}"}), 400
+
+    try:
+        bounds = {}
+        for key in ("start", "end"):
+            value = request.args.get(key)
+            if value:
+                bounds[key] = _parse_local(value).strftime('%Y-%m-%dT%H:%M:%S')
+    except Exception:
+        return jsonify({"ok": False, "error": "Invalid start/end timestamp"}), 400
+
+    try:
+        rollup = load_rollup(source, resolution)
+        if rollup is None:
+            return jsonify({"ok": False, "error": f"No {source} rollup published yet. Run backend: make model"}), 404
+        key = ("timeline", source, resolution, bounds.get("start"), bounds.get("end"), rollup.get("built"))
+        return _cached_json(
+            key,
+            lambda: jsonify({"ok": True, **slice_rollup(rollup, bounds.get("start"), bounds.get("end"))}),
+            cache_control="public, max-age=60",
+        )
     except Exception as e:
         return jsonify({"ok": False, "error": str(e), "trace": traceback.format_exc()}), 500
 
 
+@app.route("/forecast", methods=["GET"])
+def forecast():
+    """Stream forecast rows (time, score, color, quantiles) as NDJSON or Arrow IPC.
+
+    Query: ?start=&end= (ISO, start <= time < end), ?format=ndjson|arrow, ?quantiles=0 to omit bands.
+    Rows come from the memory-mapped forecast store and are sent in chunks.
+    """
+    fmt = request.args.get("format", "ndjson")
+    if fmt not in ("ndjson", "arrow"):
+        return jsonify({"ok": False, "error": "Invalid format. Use ndjson or arrow"}), 400
+    quantiles = request.args.get("quantiles", "1").lower() not in ("0", "false", "no")
+    try:
+        bounds = {}
+        for key in ("start", "end"):
+            value = request.args.get(key)
+            if value:
+                bounds[key] = _parse_local(value)
+    except Exception:
+        return jsonify({"ok": False, "error": "Invalid start/end timestamp"}), 400
+
+    path = latest_forecast_store()
+    if path is None:
+        return jsonify({"ok": False, "error": "No forecast store found. Run backend: make model"}), 404
+    rec = open_forecast_store(path)
+    headers = {
+        "X-Forecast-Source": os.path.basename(path),
+        "Last-Modified": http_date(os.path.getmtime(path)),
+        "Cache-Control": "no-cache",
+    }
+
+    if fmt == "arrow":
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            return jsonify({"ok": False, "error": "Arrow output needs pyarrow installed"}), 501
+        chunks = iter_arrow(rec, bounds.get("start"), bounds.get("end"), quantiles=quantiles)
+        return Response(stream_with_context(chunks), mimetype="application/vnd.apache.arrow.stream", headers=headers)
+    chunks = iter_ndjson(rec, bounds.get("start"), bounds.get("end"), quantiles=quantiles)
+    return Response(stream_with_context(chunks), mimetype="application/x-ndjson", headers=headers)
+
+
 if __name__ == "__main__":
     app.run(host="0.0.0.0", port=5000, debug=True)
\ No newline at end of file
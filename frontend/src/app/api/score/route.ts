@@ -4,6 +4,45 @@ import path from 'path';
 
 type Row = { time: string; score: number; timestamp: string; color?: string };
 
+const BACKEND_URL = process.env.BACKEND_URL || 'http://127.0.0.1:5000';
+// a hung backend must not block the CSV fallback; covers connecting and reading the body
+const BACKEND_TIMEOUT_MS = Number(process.env.BACKEND_TIMEOUT_MS) || 3000;
+
+function toRow(dateStr: string, scoreValue: unknown, color?: string): Row | null {
+  const ts = new Date(dateStr);
+  if (isNaN(ts.getTime())) return null;
+  const hh = String(ts.getHours()).padStart(2, '0');
+  const mm = String(ts.getMinutes()).padStart(2, '0');
+  const n = Number(scoreValue);
+  const score = Number.isFinite(n) ? Math.round(n * 100) / 100 : NaN;
+  if (!isFinite(score)) return null;
+  return { time: `${hh}:${mm}`, score, timestamp: ts.toISOString(), color };
+}
+
+// Forecast rows streamed by the backend as NDJSON (GET /forecast); null if the backend is
+// unreachable or does not answer within BACKEND_TIMEOUT_MS.
+async function fetchBackendForecast(): Promise<{ data: Row[]; lastModified: string; source: string } | null> {
+  try {
+    const resp = await fetch(`${BACKEND_URL}/forecast?quantiles=0`, {
+      cache: 'no-store',
+      signal: AbortSignal.timeout(BACKEND_TIMEOUT_MS),
+    });
+    if (!resp.ok) return null;
+    const text = await resp.text();
+    const data: Row[] = [];
+    for (const line of text.split('\n')) {
+      if (!line.trim()) continue;
+      const r = JSON.parse(line);
+      const row = toRow(r.time, r.score, r.color ? String(r.color).toLowerCase() : undefined);
+      if (row) data.push(row);
+    }
+    const lastModified = new Date(resp.headers.get('last-modified') || Date.now()).toISOString();
+    return { data, lastModified, source: resp.headers.get('x-forecast-source') || 'backend' };
+  } catch {
+    return null;
+  }
+}
+
 function findLatestColoredCsv(baseDir: string): string | null {
   // Try multiple possible paths for the backend data directory
   const possiblePaths = [
@@ -53,33 +92,31 @@ function parseCsv(content: string): Row[] {
     const dateStr = parts[idxData];
     const scoreStr = parts[idxScore];
     if (!dateStr || !scoreStr) continue;
-    const ts = new Date(dateStr);
-    if (isNaN(ts.getTime())) continue;
-    const hh = String(ts.getHours()).padStart(2, '0');
-    const mm = String(ts.getMinutes()).padStart(2, '0');
-    const n = Number(scoreStr);
-    const score = Number.isFinite(n) ? Math.round(n * 100) / 100 : NaN;
-    if (!isFinite(score)) continue;
     const color = idxColor !== -1 ? String(parts[idxColor] || '').toLowerCase() : undefined;
-    rows.push({ time: `${hh}:${mm}`, score, timestamp: ts.toISOString(), color });
+    const row = toRow(dateStr, scoreStr, color);
+    if (row) rows.push(row);
   }
   return rows;
 }
 
 export async function GET() {
   try {
-    const baseDir = process.cwd();
-    const filePath = findLatestColoredCsv(baseDir);
-    if (!filePath) {
-      return NextResponse.json(
-        { error: 'No colored prediction CSV found. Run backend: make run' },
-        { status: 404 }
-      );
+    // Prefer the backend's forecast stream; fall back to the CSV on disk when it is not running
+    let forecast = await fetchBackendForecast();
+    if (!forecast) {
+      const baseDir = process.cwd();
+      const filePath = findLatestColoredCsv(baseDir);
+      if (!filePath) {
+        return NextResponse.json(
+          { error: 'No colored prediction CSV found. Run backend: make run' },
+          { status: 404 }
+        );
+      }
+      const content = fs.readFileSync(filePath, 'utf-8');
+      const stat = fs.statSync(filePath);
+      forecast = { data: parseCsv(content), lastModified: stat.mtime.toISOString(), source: path.basename(filePath) };
     }
-  const content = fs.readFileSync(filePath, 'utf-8');
-    const data = parseCsv(content);
-  const stat = fs.statSync(filePath);
-  const lastModified = stat.mtime.toISOString();
+    const { data, lastModified, source } = forecast;
   let currentScore: number | null = null;
   let currentColor: string | null = null;
   let currentTime: string | null = null;
@@ -101,7 +138,7 @@ export async function GET() {
         currentTime = bucketStart.toISOString();
       }
     }
-    return NextResponse.json({ data, currentScore, currentColor, currentTime, lastModified, source: path.basename(filePath) });
+    return NextResponse.json({ data, currentScore, currentColor, currentTime, lastModified, source });
   } catch (e: any) {
     return NextResponse.json({ error: String(e?.message || e) }, { status: 500 });
   }